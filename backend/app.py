@@ -1,7 +1,10 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
+import os
 import json
 import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from scanner.ssl_check import SSLChecker
 from scanner.headers_check import HeadersChecker
 from scanner.sql_injection import SQLInjectionChecker
@@ -9,12 +12,21 @@ from scanner.xss_check import XSSChecker
 from scanner.dir_scan import DirectoryScanner
 from scanner.port_scan import PortScanner
 from scanner.sensitive_info import SensitiveInfoScanner
+from scanner.response_cache import ResponseCache
+from scanner.path_probe import PathProbe
+from jobs import JobManager, QueueFullError
+from batch import FairScheduler
+from history import ScanHistory, ResourceStateStore
+from scanner.incremental import IncrementalState
 
 app = Flask(__name__)
 CORS(app)
 
+class ScanCancelled(Exception):
+    """Raised inside a scan whose cancel event was set"""
+
 class VulnerabilityScanner:
-    def __init__(self):
+    def __init__(self, concurrent=True, max_workers=64, history=None, incremental_state=None, queue_allowance=300):
         self.ssl_checker = SSLChecker()
         self.headers_checker = HeadersChecker()
         self.sql_checker = SQLInjectionChecker()
@@ -22,87 +34,308 @@ class VulnerabilityScanner:
         self.dir_scanner = DirectoryScanner()
         self.port_scanner = PortScanner()
         self.sensitive_scanner = SensitiveInfoScanner()
+
+        # Checker name, instance and per-check deadline in seconds
+        self.checkers = [
+            ('SSL/TLS', self.ssl_checker, 30),
+            ('Security Headers', self.headers_checker, 20),
+            ('SQL Injection', self.sql_checker, 120),
+            ('XSS', self.xss_checker, 90),
+            ('Directory Scan', self.dir_scanner, 120),
+            ('Port Scan', self.port_scanner, 30),
+            ('Sensitive Information', self.sensitive_scanner, 90)
+        ]
+        self.concurrent = concurrent
+        self.history = history  # Optional ScanHistory every completed scan is recorded in
+        # Resource state shared by incremental rescans
+        self.incremental_state = incremental_state or IncrementalState()
+        # Shared across scans so a checker stuck past its deadline never
+        # blocks the request that abandoned it
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='checker')
+        # Seconds a checker may wait for a free worker on top of its own
+        # deadline before the scan gives up on it
+        self.queue_allowance = queue_allowance
     
-    def scan_url(self, url):
-        """Perform comprehensive security scan on given URL"""
-        results = {
-            'url': url,
-            'timestamp': datetime.datetime.now().isoformat(),
-            'vulnerabilities': [],
-            'summary': {
-                'total_issues': 0,
-                'critical': 0,
-                'high': 0,
-                'medium': 0,
-                'low': 0,
-                'info': 0
-            }
-        }
+    def scan_url(self, url, concurrent=None, cancel_event=None, incremental=False):
+        """Perform comprehensive security scan on given URL
+        
+        With incremental=True, resources unchanged since the previous
+        incremental scan (by ETag/Last-Modified or body hash) reuse their
+        earlier analysis instead of being analysed again.
+        """
+        results = self._new_results(url)
         
         try:
-            # SSL/HTTPS Check
-            ssl_results = self.ssl_checker.check(url)
-            results['vulnerabilities'].extend(ssl_results)
-            
-            # Security Headers Check
-            headers_results = self.headers_checker.check(url)
-            results['vulnerabilities'].extend(headers_results)
-            
-            # SQL Injection Check
-            sql_results = self.sql_checker.check(url)
-            results['vulnerabilities'].extend(sql_results)
-            
-            # XSS Check
-            xss_results = self.xss_checker.check(url)
-            results['vulnerabilities'].extend(xss_results)
-            
-            # Directory Scanning
-            dir_results = self.dir_scanner.check(url)
-            results['vulnerabilities'].extend(dir_results)
-            
-            # Port Scanning
-            port_results = self.port_scanner.check(url)
-            results['vulnerabilities'].extend(port_results)
+            # Findings are merged in checker order so reports stay stable
+            checker_results = [[] for _ in self.checkers]
+            for index, _, findings in self.iter_checker_results(url, concurrent, cancel_event, incremental):
+                checker_results[index] = findings
             
-            # Sensitive Information Check
-            sensitive_results = self.sensitive_scanner.check(url)
-            results['vulnerabilities'].extend(sensitive_results)
+            for findings in checker_results:
+                results['vulnerabilities'].extend(findings)
             
             # Calculate summary
-            for vuln in results['vulnerabilities']:
-                results['summary']['total_issues'] += 1
-                severity = vuln.get('severity', 'info').lower()
-                if severity in results['summary']:
-                    results['summary'][severity] += 1
+            self._summarize(results)
+            self._record(results)
             
             return results
             
+        except ScanCancelled:
+            return {
+                'error': 'Scan cancelled',
+                'url': url,
+                'timestamp': datetime.datetime.now().isoformat()
+            }
         except Exception as e:
             return {
                 'error': f'Scan failed: {str(e)}',
                 'url': url,
                 'timestamp': datetime.datetime.now().isoformat()
             }
+    
+    def stream_scan(self, url, cancel_event=None, incremental=False):
+        """Yield a progress event per finished checker, then the merged results"""
+        results = self._new_results(url)
+        yield {
+            'event': 'start',
+            'url': url,
+            'timestamp': results['timestamp'],
+            'checkers': [name for name, _, _ in self.checkers]
+        }
+        
+        checker_results = [[] for _ in self.checkers]
+        try:
+            completed = 0
+            for index, name, findings in self.iter_checker_results(url, cancel_event=cancel_event,
+                                                                   incremental=incremental):
+                completed += 1
+                checker_results[index] = findings
+                self._count_findings(results['summary'], findings)
+                yield {
+                    'event': 'checker',
+                    'checker': name,
+                    'vulnerabilities': findings,
+                    'summary': dict(results['summary']),
+                    'completed': completed,
+                    'total': len(self.checkers)
+                }
+        except ScanCancelled:
+            yield {'event': 'error', 'error': 'Scan cancelled', 'url': url}
+            return
+        except Exception as e:
+            yield {'event': 'error', 'error': f'Scan failed: {str(e)}', 'url': url}
+            return
+        
+        for findings in checker_results:
+            results['vulnerabilities'].extend(findings)
+        self._record(results)
+        yield {'event': 'complete', 'results': results}
+    
+    def iter_checker_results(self, url, concurrent=None, cancel_event=None, incremental=False):
+        """Yield (index, name, findings) for each checker as soon as it finishes"""
+        if concurrent is None:
+            concurrent = self.concurrent
+        state = self._new_scan_state(incremental)
+        
+        if not concurrent:
+            for index, (name, checker, _) in enumerate(self.checkers):
+                self._check_cancelled(cancel_event)
+                yield index, name, checker.check(url, **self._checker_kwargs(checker, state))
+            return
+        
+        # Dispatch every checker at once, each bounded by its own deadline.
+        # Deadlines run from when a checker starts, not from when it was
+        # queued, so a busy pool (e.g. during batch scans) cannot time
+        # checkers out before they ran. As a backstop, a checker is given
+        # up at most queue_allowance seconds later than a deadline counted
+        # from submission, so a pool filled by stuck checkers cannot hold
+        # the scan forever.
+        start_times = {}
+        
+        def run_checker(index, checker):
+            start_times[index] = time.monotonic()
+            return checker.check(url, **self._checker_kwargs(checker, state))
+        
+        def deadline(index, timeout):
+            backstop = submitted + timeout + self.queue_allowance
+            return min(start_times[index] + timeout, backstop) if index in start_times else backstop
+        
+        pending = {}
+        submitted = time.monotonic()
+        for index, (name, checker, timeout) in enumerate(self.checkers):
+            pending[self.executor.submit(run_checker, index, checker)] = (index, name, timeout)
+        
+        while pending:
+            self._check_cancelled(cancel_event)
+            
+            wait_time = max(0, min(deadline(index, timeout) for index, _, timeout in pending.values())
+                            - time.monotonic())
+            if cancel_event is not None or any(index not in start_times for index, _, _ in pending.values()):
+                wait_time = min(wait_time, 0.5)
+            done, _ = wait(pending, timeout=wait_time, return_when=FIRST_COMPLETED)
+            
+            for future in done:
+                index, name, _ = pending.pop(future)
+                try:
+                    findings = future.result()
+                except Exception as e:
+                    findings = [{
+                        'type': f'{name} Check Error',
+                        'severity': 'info',
+                        'description': f'{name} check failed: {str(e)}',
+                        'recommendation': 'Manual review recommended'
+                    }]
+                yield index, name, findings
+            
+            # Checkers past their deadline keep running in the background
+            # but no longer hold up the scan
+            now = time.monotonic()
+            for future, (index, name, timeout) in list(pending.items()):
+                if deadline(index, timeout) <= now:
+                    del pending[future]
+                    # Never started: drop it from the queue and say why
+                    queued = future.cancel()
+                    yield index, name, [self._timeout_finding(name, timeout, queued)]
+    
+    def _record(self, results):
+        """Save a completed scan to the history store, if one is configured"""
+        if self.history is None:
+            return
+        try:
+            results['scan_id'] = self.history.record(results)
+        except Exception:
+            pass  # History is best effort; never fail the scan over it
+    
+    def _check_cancelled(self, cancel_event):
+        if cancel_event is not None and cancel_event.is_set():
+            raise ScanCancelled()
+    
+    def _new_results(self, url):
+        return {
+            'url': url,
+            'timestamp': datetime.datetime.now().isoformat(),
+            'vulnerabilities': [],
+            'summary': {
+                'total_issues': 0,
+                'critical': 0,
+                'high': 0,
+                'medium': 0,
+                'low': 0,
+                'info': 0
+            }
+        }
+    
+    def _new_scan_state(self, incremental=False):
+        """Create the caches and probe stages shared by one scan's checkers"""
+        incremental_state = self.incremental_state if incremental else None
+        probe = PathProbe(incremental=incremental_state)
+        self.dir_scanner.register_probes(probe)
+        self.sensitive_scanner.register_probes(probe)
+        return {'cache': ResponseCache(incremental=incremental_state), 'probe': probe}
+    
+    def _checker_kwargs(self, checker, state):
+        """Per-scan state shared with a checker"""
+        if checker is self.port_scanner:
+            return {}
+        # Directory scanning only uses the path probe
+        if checker is self.dir_scanner:
+            return {'probe': state['probe']}
+        kwargs = {'cache': state['cache']}
+        if checker is self.sensitive_scanner:
+            kwargs['probe'] = state['probe']
+        return kwargs
+    
+    def _timeout_finding(self, name, timeout, queued=False):
+        """Create the finding reported for a checker that missed its deadline"""
+        if queued:
+            description = f'{name} check did not start within {timeout + self.queue_allowance} seconds (scanner busy)'
+        else:
+            description = f'{name} check did not complete within {timeout} seconds'
+        return {
+            'type': f'{name} Check Timeout',
+            'severity': 'info',
+            'description': description,
+            'impact': f'{name} results are missing from this report',
+            'recommendation': 'Retry the scan or review this area manually'
+        }
+    
+    def _summarize(self, results):
+        """Count findings per severity into the results summary"""
+        self._count_findings(results['summary'], results['vulnerabilities'])
+    
+    def _count_findings(self, summary, findings):
+        for vuln in findings:
+            summary['total_issues'] += 1
+            severity = vuln.get('severity', 'info').lower()
+            if severity in summary:
+                summary[severity] += 1
+
+history_path = os.environ.get(
+    'SECURESCOPE_HISTORY_DB',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scan_history.db')
+)
+history = ScanHistory(history_path)
+scanner = VulnerabilityScanner(
+    history=history,
+    incremental_state=IncrementalState(ResourceStateStore(history_path))
+)
+jobs = JobManager(scanner.scan_url)
+batch_scheduler = FairScheduler(scanner.scan_url)
+
+def _parse_scan_url(data):
+    """Validate a scan request object and return (url, error message)"""
+    if not isinstance(data, dict) or 'url' not in data:
+        return None, 'URL is required'
+    if not isinstance(data['url'], str):
+        return None, 'URL must be a string'
+    
+    url = data['url'].strip()
+    if not url:
+        return None, 'URL cannot be empty'
+    
+    # Basic URL validation
+    if not (url.startswith('http://') or url.startswith('https://')):
+        url = 'https://' + url
+    
+    return url, None
+
+def _get_scan_url(data):
+    """Validate the request body and return (url, error_response)"""
+    url, error = _parse_scan_url(data)
+    if error:
+        return None, (jsonify({'error': error}), 400)
+    return url, None
 
-scanner = VulnerabilityScanner()
+def _iter_batch_urls(stream):
+    """Yield URLs from a body of one URL (or {"url": ...} JSON object) per line
+
+    Lines that are invalid JSON, or JSON without a string url, are skipped.
+    """
+    for line in stream:
+        line = line.decode('utf-8', errors='ignore').strip()
+        if not line:
+            continue
+        if line.startswith(('{', '[')):
+            try:
+                data = json.loads(line)
+            except ValueError:
+                continue
+        else:
+            data = {'url': line}
+        url, error = _parse_scan_url(data)
+        if not error:
+            yield url
 
 @app.route('/api/scan', methods=['POST'])
 def scan_endpoint():
     """Main scanning endpoint"""
     try:
-        data = request.get_json()
-        if not data or 'url' not in data:
-            return jsonify({'error': 'URL is required'}), 400
-        
-        url = data['url'].strip()
-        if not url:
-            return jsonify({'error': 'URL cannot be empty'}), 400
-        
-        # Basic URL validation
-        if not (url.startswith('http://') or url.startswith('https://')):
-            url = 'https://' + url
+        data = request.get_json(silent=True)
+        url, error = _get_scan_url(data)
+        if error:
+            return error
         
-        results = scanner.scan_url(url)
+        results = scanner.scan_url(url, incremental=bool(data.get('incremental')))
         
         if 'error' in results:
             return jsonify(results), 500
@@ -112,10 +345,147 @@ def scan_endpoint():
     except Exception as e:
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
 
+@app.route('/api/scan/stream', methods=['POST'])
+def stream_scan_endpoint():
+    """Scan a URL, streaming each checker's findings as NDJSON or Server-Sent Events"""
+    try:
+        data = request.get_json(silent=True)
+        url, error = _get_scan_url(data)
+        if error:
+            return error
+        incremental = bool(data.get('incremental'))
+        
+        use_sse = (request.args.get('format') == 'sse'
+                   or 'text/event-stream' in request.headers.get('Accept', ''))
+    except Exception as e:
+        return jsonify({'error': f'Internal server error: {str(e)}'}), 500
+    
+    def generate():
+        for event in scanner.stream_scan(url, incremental=incremental):
+            if use_sse:
+                yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+            else:
+                yield json.dumps(event) + '\n'
+    
+    response = Response(stream_with_context(generate()),
+                        mimetype='text/event-stream' if use_sse else 'application/x-ndjson')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Disable proxy buffering
+    return response
+
+@app.route('/api/batch', methods=['POST'])
+def batch_scan_endpoint():
+    """Scan a streamed list of URLs, emitting NDJSON results as each scan finishes"""
+    incremental = request.args.get('incremental') in ('1', 'true')
+    
+    def generate():
+        scanned = failed = 0
+        urls = _iter_batch_urls(request.stream)
+        for index, url, results in batch_scheduler.run(urls, incremental=incremental):
+            scanned += 1
+            failed += 'error' in results
+            yield json.dumps({'event': 'result', 'index': index, 'url': url, 'results': results}) + '\n'
+        yield json.dumps({'event': 'complete', 'scanned': scanned, 'failed': failed}) + '\n'
+    
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/scans', methods=['POST'])
+def create_scan_job():
+    """Queue a scan and return its job id without waiting for it"""
+    try:
+        data = request.get_json(silent=True)
+        url, error = _get_scan_url(data)
+        if error:
+            return error
+        
+        try:
+            job = jobs.submit(url, incremental=bool(data.get('incremental')))
+        except QueueFullError as e:
+            response = jsonify({'error': str(e)})
+            response.headers['Retry-After'] = '30'
+            return response, 503
+        
+        response = jsonify(job.to_dict())
+        response.headers['Location'] = f'/api/scans/{job.id}'
+        return response, 202
+        
+    except Exception as e:
+        return jsonify({'error': f'Internal server error: {str(e)}'}), 500
+
+@app.route('/api/scans/<job_id>', methods=['GET'])
+def get_scan_job(job_id):
+    """Scan job status, including results once finished"""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Scan job not found'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/scans/<job_id>/results', methods=['GET'])
+def get_scan_job_results(job_id):
+    """Results of a finished scan job"""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Scan job not found'}), 404
+    if job.result is None:
+        return jsonify({'error': f'Scan job is {job.status}', 'status': job.status}), 409
+    return jsonify(job.result)
+
+@app.route('/api/scans/<job_id>', methods=['DELETE'])
+def cancel_scan_job(job_id):
+    """Cancel a queued or running scan job"""
+    job = jobs.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Scan job not found'}), 404
+    return jsonify(job.to_dict(include_result=False))
+
+def _history_filters():
+    """Common query-string filters for the history endpoints"""
+    severity = request.args.get('severity')
+    days = request.args.get('days', type=float)
+    return {
+        'severity': severity.split(',') if severity else None,
+        'finding_type': request.args.get('type'),
+        'match': request.args.get('match'),
+        'since': time.time() - days * 86400 if days else None,
+        'limit': min(request.args.get('limit', 1000, type=int), 10000)
+    }
+
+@app.route('/api/history/findings', methods=['GET'])
+def history_findings():
+    """Stored findings, e.g. ?host=example.com&severity=critical&days=30"""
+    try:
+        return jsonify(history.findings(host=request.args.get('host'), **_history_filters()))
+    except Exception as e:
+        return jsonify({'error': f'History query failed: {str(e)}'}), 500
+
+@app.route('/api/history/hosts', methods=['GET'])
+def history_hosts():
+    """Hosts with matching findings, e.g. ?match=.git"""
+    try:
+        return jsonify(history.hosts(**_history_filters()))
+    except Exception as e:
+        return jsonify({'error': f'History query failed: {str(e)}'}), 500
+
+@app.route('/api/history/scans', methods=['GET'])
+def history_scans():
+    """Recent scans with their summaries"""
+    try:
+        return jsonify(history.scans(host=request.args.get('host'),
+                                     limit=min(request.args.get('limit', 100, type=int), 1000)))
+    except Exception as e:
+        return jsonify({'error': f'History query failed: {str(e)}'}), 500
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'timestamp': datetime.datetime.now().isoformat()})
+    return jsonify({
+        'status': 'healthy',
+        'timestamp': datetime.datetime.now().isoformat(),
+        'jobs': jobs.stats()
+    })
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,109 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+
+class FairScheduler:
+    """Runs scans from many hosts on one shared worker pool
+
+    Hosts are served round-robin and each host may occupy at most
+    `per_host` workers across all running batches, so one slow host can
+    only ever hold up its own URLs.
+    """
+
+    def __init__(self, scan_func, max_workers=8, per_host=1, max_buffered=10000):
+        self.scan_func = scan_func
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.max_buffered = max_buffered  # URLs read ahead of the workers per batch
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='batch-scan')
+        self.host_in_flight = {}
+        self.lock = threading.Lock()
+
+    def run(self, urls, **options):
+        """Scan every URL from an iterable, yielding (index, url, results) as scans finish
+
+        urls is read lazily, so a streamed request body is never held in
+        memory as a whole. options are passed through to scan_func.
+        """
+        urls = enumerate(urls)
+        queues = OrderedDict()  # host -> deque of (index, url), in round-robin order
+        buffered = 0
+        exhausted = False
+        pending = {}
+
+        try:
+            while True:
+                # Read ahead until the buffer is full or the input ends
+                while not exhausted and buffered < self.max_buffered:
+                    item = next(urls, None)
+                    if item is None:
+                        exhausted = True
+                        break
+                    queues.setdefault(self._host(item[1]), deque()).append(item)
+                    buffered += 1
+
+                buffered -= self._dispatch(queues, pending, options)
+
+                if not pending:
+                    if exhausted and not queues:
+                        return
+                    # Every buffered host is busy in another batch
+                    time.sleep(0.5)
+                    continue
+
+                done, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, url, host = pending.pop(future)
+                    self._release(host)
+                    try:
+                        results = future.result()
+                    except Exception as e:
+                        results = {'error': f'Scan failed: {str(e)}', 'url': url}
+                    yield index, url, results
+        finally:
+            # Abandoned batch (e.g. client disconnected): drop queued scans and
+            # free each host slot once its running scan ends
+            for future, (_, _, host) in pending.items():
+                future.cancel()
+                future.add_done_callback(lambda _, host=host: self._release(host))
+
+    def _dispatch(self, queues, pending, options):
+        """Start scans round-robin across hosts with spare capacity; returns how many started"""
+        started = 0
+        progress = True
+        while progress and len(pending) < self.max_workers:
+            progress = False
+            for host in list(queues):
+                if len(pending) >= self.max_workers:
+                    break
+                if not self._acquire(host):
+                    continue
+
+                index, url = queues[host].popleft()
+                pending[self.executor.submit(self.scan_func, url, **options)] = (index, url, host)
+                started += 1
+                progress = True
+
+                # Move the host to the back of the ring
+                queue = queues.pop(host)
+                if queue:
+                    queues[host] = queue
+        return started
+
+    def _acquire(self, host):
+        with self.lock:
+            if self.host_in_flight.get(host, 0) >= self.per_host:
+                return False
+            self.host_in_flight[host] = self.host_in_flight.get(host, 0) + 1
+            return True
+
+    def _release(self, host):
+        with self.lock:
+            self.host_in_flight[host] -= 1
+            if not self.host_in_flight[host]:
+                del self.host_in_flight[host]
+
+    def _host(self, url):
+        return (urlparse(url).hostname or url).lower()
@@ -0,0 +1,69 @@
+"""Micro-benchmark: one-regex-per-pattern scans vs. the combined PatternSet
+
+Run from the backend directory:
+
+    python benchmarks/matcher_bench.py [size_mb]
+"""
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scanner.sql_injection import SQLInjectionChecker
+from scanner.sensitive_info import SensitiveInfoScanner
+
+def make_body(size_mb, tail=''):
+    """HTML-ish filler of roughly size_mb megabytes, with tail appended"""
+    line = '<div class="row"><a href="/item?id=42">Product 42</a> <span>In stock: 17 units</span></div>\n'
+    return line * (size_mb * 1024 * 1024 // len(line)) + tail
+
+def timed(func, repeat=5):
+    """Best wall time of func() over repeat runs"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def naive_sql_errors(patterns, content):
+    content_lower = content.lower()
+    for _, pattern in patterns:
+        if re.search(pattern, content_lower, re.IGNORECASE):
+            return True
+    return False
+
+def naive_sensitive(patterns, content):
+    return {name: re.findall(pattern, content) for name, pattern in patterns.items()}
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    sql = SQLInjectionChecker()
+    sensitive = SensitiveInfoScanner()
+
+    bodies = {
+        'clean': make_body(size_mb),
+        'error at end': make_body(size_mb, 'You have an error in your SQL syntax; check the manual for MySQL'),
+        'secrets at end': make_body(size_mb, 'mail bob@corp.com api_key=ABCDEFGHIJKLMNOPQRSTUVWX 555-123-4567')
+    }
+
+    print(f'{size_mb} MB bodies, best of 5')
+    print(f'{"case":<16} {"check":<12} {"per-pattern":>12} {"PatternSet":>12} {"speedup":>8}')
+    for label, body in bodies.items():
+        cases = [
+            ('sql errors', lambda: naive_sql_errors(sql.error_patterns, body),
+             lambda: sql.error_matcher.search(body)),
+            ('sensitive', lambda: naive_sensitive(sensitive.sensitive_patterns, body),
+             lambda: sensitive.pattern_matcher.findall(body))
+        ]
+        for check, naive, combined in cases:
+            naive_time = timed(naive)
+            combined_time = timed(combined)
+            print(f'{label:<16} {check:<12} {naive_time * 1000:>10.1f}ms {combined_time * 1000:>10.1f}ms '
+                  f'{naive_time / combined_time:>7.1f}x')
+
+if __name__ == '__main__':
+    main()
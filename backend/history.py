@@ -0,0 +1,312 @@
+import sqlite3
+import json
+import threading
+import time
+import datetime
+from urllib.parse import urlparse
+
+SEVERITY_LEVELS = {'info': 0, 'low': 1, 'medium': 2, 'high': 3, 'critical': 4}
+SEVERITY_NAMES = {level: name for name, level in SEVERITY_LEVELS.items()}
+
+# Finding fields stored as ids into the interned strings table
+TEXT_FIELDS = ('type', 'title', 'description', 'details', 'impact', 'recommendation')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS hosts (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS strings (
+    id INTEGER PRIMARY KEY,
+    value TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY,
+    host_id INTEGER NOT NULL REFERENCES hosts(id),
+    url TEXT NOT NULL,
+    scanned_at INTEGER NOT NULL,
+    total INTEGER NOT NULL DEFAULT 0,
+    critical INTEGER NOT NULL DEFAULT 0,
+    high INTEGER NOT NULL DEFAULT 0,
+    medium INTEGER NOT NULL DEFAULT 0,
+    low INTEGER NOT NULL DEFAULT 0,
+    info INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS findings (
+    id INTEGER PRIMARY KEY,
+    scan_id INTEGER NOT NULL REFERENCES scans(id),
+    host_id INTEGER NOT NULL,
+    scanned_at INTEGER NOT NULL,
+    severity INTEGER NOT NULL,
+    type_id INTEGER,
+    title_id INTEGER,
+    description_id INTEGER,
+    details_id INTEGER,
+    impact_id INTEGER,
+    recommendation_id INTEGER
+);
+CREATE TABLE IF NOT EXISTS resource_state (
+    key TEXT PRIMARY KEY,
+    state TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS scans_host_time ON scans(host_id, scanned_at);
+CREATE INDEX IF NOT EXISTS findings_scan ON findings(scan_id);
+CREATE INDEX IF NOT EXISTS findings_host_time ON findings(host_id, scanned_at);
+CREATE INDEX IF NOT EXISTS findings_host_severity_time ON findings(host_id, severity, scanned_at);
+CREATE INDEX IF NOT EXISTS findings_severity_time ON findings(severity, scanned_at);
+CREATE INDEX IF NOT EXISTS findings_type_time ON findings(type_id, scanned_at);
+CREATE INDEX IF NOT EXISTS findings_title ON findings(title_id);
+CREATE INDEX IF NOT EXISTS findings_description ON findings(description_id);
+CREATE INDEX IF NOT EXISTS findings_details ON findings(details_id);
+'''
+
+class ScanHistory:
+    """SQLite store of every scan and its findings
+
+    Findings are kept as compact integer rows: host, severity and all
+    text fields are ids into small lookup tables, so repeated text (the
+    same missing header on every scan) is stored once.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._string_ids = {}
+        self._host_ids = {}
+        with self._write_lock:
+            self._connection().executescript(SCHEMA)
+
+    def record(self, results):
+        """Store a scan_url result; returns the new scan id"""
+        url = results['url']
+        host = self._host_of(url)
+        scanned_at = int(time.time())
+        summary = results.get('summary', {})
+
+        with self._write_lock:
+            conn = self._connection()
+            try:
+                with conn:
+                    host_id = self._host_id(conn, host)
+                    cursor = conn.execute(
+                        'INSERT INTO scans (host_id, url, scanned_at, total, critical, high, medium, low, info) '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                        (host_id, url, scanned_at, summary.get('total_issues', 0), summary.get('critical', 0),
+                         summary.get('high', 0), summary.get('medium', 0), summary.get('low', 0),
+                         summary.get('info', 0)))
+                    scan_id = cursor.lastrowid
+
+                    rows = []
+                    for vuln in results.get('vulnerabilities', []):
+                        severity = SEVERITY_LEVELS.get(str(vuln.get('severity', 'info')).lower(), 0)
+                        text_ids = [self._string_id(conn, vuln.get(field)) for field in TEXT_FIELDS]
+                        rows.append((scan_id, host_id, scanned_at, severity, *text_ids))
+
+                    conn.executemany(
+                        'INSERT INTO findings (scan_id, host_id, scanned_at, severity, type_id, title_id, '
+                        'description_id, details_id, impact_id, recommendation_id) '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            except Exception:
+                # Ids handed out inside the rolled-back transaction are void
+                self._string_ids.clear()
+                self._host_ids.clear()
+                raise
+
+        return scan_id
+
+    def findings(self, host=None, severity=None, finding_type=None, match=None,
+                 since=None, until=None, limit=1000):
+        """Query findings, newest first
+
+        severity is a name or list of names; match is a substring looked up
+        in title, description and details; since/until are datetimes or
+        epoch seconds.
+        """
+        conditions, params = self._filters(host, severity, finding_type, match, since, until)
+        if conditions is None:
+            return []
+
+        query = (
+            'SELECT f.scan_id, h.name, s.url, f.scanned_at, f.severity, '
+            + ', '.join(f'{field}_text.value' for field in TEXT_FIELDS)
+            + ' FROM findings f JOIN hosts h ON h.id = f.host_id JOIN scans s ON s.id = f.scan_id '
+            + ' '.join(f'LEFT JOIN strings {field}_text ON {field}_text.id = f.{field}_id'
+                       for field in TEXT_FIELDS)
+        )
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY f.scanned_at DESC, f.id DESC LIMIT ?'
+        params.append(limit)
+
+        findings = []
+        for row in self._connection().execute(query, params):
+            finding = {
+                'scan_id': row[0],
+                'host': row[1],
+                'url': row[2],
+                'timestamp': self._isoformat(row[3]),
+                'severity': SEVERITY_NAMES.get(row[4], 'info')
+            }
+            for field, value in zip(TEXT_FIELDS, row[5:]):
+                if value is not None:
+                    finding[field] = value
+            findings.append(finding)
+        return findings
+
+    def hosts(self, match=None, finding_type=None, severity=None, since=None, until=None, limit=1000):
+        """Hosts with at least one matching finding, e.g. hosts(match='.git')"""
+        conditions, params = self._filters(None, severity, finding_type, match, since, until)
+        if conditions is None:
+            return []
+
+        query = ('SELECT h.name, COUNT(*), MAX(f.scanned_at) FROM findings f '
+                 'JOIN hosts h ON h.id = f.host_id')
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' GROUP BY f.host_id ORDER BY MAX(f.scanned_at) DESC LIMIT ?'
+        params.append(limit)
+
+        return [
+            {'host': name, 'findings': count, 'last_seen': self._isoformat(last_seen)}
+            for name, count, last_seen in self._connection().execute(query, params)
+        ]
+
+    def scans(self, host=None, limit=100):
+        """Recent scans with their severity summary, newest first"""
+        query = ('SELECT s.id, h.name, s.url, s.scanned_at, s.total, s.critical, s.high, s.medium, '
+                 's.low, s.info FROM scans s JOIN hosts h ON h.id = s.host_id')
+        params = []
+        if host:
+            query += ' WHERE s.host_id = (SELECT id FROM hosts WHERE name = ?)'
+            params.append(host.lower())
+        query += ' ORDER BY s.scanned_at DESC, s.id DESC LIMIT ?'
+        params.append(limit)
+
+        return [
+            {
+                'scan_id': row[0],
+                'host': row[1],
+                'url': row[2],
+                'timestamp': self._isoformat(row[3]),
+                'summary': dict(zip(('total_issues', 'critical', 'high', 'medium', 'low', 'info'), row[4:]))
+            }
+            for row in self._connection().execute(query, params)
+        ]
+
+    def _filters(self, host, severity, finding_type, match, since, until):
+        """Build WHERE conditions on indexed columns; None means nothing can match"""
+        conn = self._connection()
+        conditions, params = [], []
+
+        if host:
+            row = conn.execute('SELECT id FROM hosts WHERE name = ?', (host.lower(),)).fetchone()
+            if row is None:
+                return None, None
+            conditions.append('f.host_id = ?')
+            params.append(row[0])
+
+        if severity:
+            names = [severity] if isinstance(severity, str) else list(severity)
+            levels = [SEVERITY_LEVELS[name.lower()] for name in names if name.lower() in SEVERITY_LEVELS]
+            if not levels:
+                return None, None
+            conditions.append(f'f.severity IN ({", ".join("?" * len(levels))})')
+            params.extend(levels)
+
+        if finding_type:
+            row = conn.execute('SELECT id FROM strings WHERE value = ?', (finding_type,)).fetchone()
+            if row is None:
+                return None, None
+            conditions.append('f.type_id = ?')
+            params.append(row[0])
+
+        if match:
+            # The LIKE scan runs over the distinct strings only; findings are
+            # then reached through their text-id indexes
+            pattern = '%' + match.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            subquery = "SELECT id FROM strings WHERE value LIKE ? ESCAPE '\\'"
+            conditions.append(f'(f.title_id IN ({subquery}) OR f.description_id IN ({subquery}) '
+                              f'OR f.details_id IN ({subquery}))')
+            params.extend([pattern] * 3)
+
+        if since is not None:
+            conditions.append('f.scanned_at >= ?')
+            params.append(self._epoch(since))
+        if until is not None:
+            conditions.append('f.scanned_at < ?')
+            params.append(self._epoch(until))
+
+        return conditions, params
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _host_id(self, conn, host):
+        host_id = self._host_ids.get(host)
+        if host_id is None:
+            conn.execute('INSERT OR IGNORE INTO hosts (name) VALUES (?)', (host,))
+            host_id = conn.execute('SELECT id FROM hosts WHERE name = ?', (host,)).fetchone()[0]
+            self._host_ids[host] = host_id
+        return host_id
+
+    def _string_id(self, conn, value):
+        if value is None:
+            return None
+        value = str(value)
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            conn.execute('INSERT OR IGNORE INTO strings (value) VALUES (?)', (value,))
+            string_id = conn.execute('SELECT id FROM strings WHERE value = ?', (value,)).fetchone()[0]
+            # Bounded in-memory view of the table; ids are stable so
+            # dropping it only costs a lookup
+            if len(self._string_ids) >= 100000:
+                self._string_ids.clear()
+            self._string_ids[value] = string_id
+        return string_id
+
+    def _host_of(self, url):
+        return (urlparse(url).hostname or url).lower()
+
+    def _epoch(self, value):
+        if isinstance(value, datetime.datetime):
+            return int(value.timestamp())
+        return int(value)
+
+    def _isoformat(self, epoch):
+        return datetime.datetime.fromtimestamp(epoch).isoformat()
+
+class ResourceStateStore:
+    """Persistent store for scanner.incremental.IncrementalState, kept next to the scan history"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        with self._write_lock:
+            self._connection().executescript(SCHEMA)
+
+    def get(self, key):
+        row = self._connection().execute('SELECT state FROM resource_state WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key, state):
+        with self._write_lock:
+            conn = self._connection()
+            with conn:
+                conn.execute('INSERT OR REPLACE INTO resource_state (key, state) VALUES (?, ?)',
+                             (key, json.dumps(state)))
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
@@ -0,0 +1,115 @@
+import threading
+import uuid
+import datetime
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at its depth limit"""
+
+class ScanJob:
+    def __init__(self, url, options=None):
+        self.id = uuid.uuid4().hex
+        self.url = url
+        self.options = options or {}
+        self.status = 'queued'
+        self.created_at = datetime.datetime.now().isoformat()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.cancel_event = threading.Event()
+        self.future = None
+
+    @property
+    def finished(self):
+        return self.status in ('completed', 'failed', 'cancelled')
+
+    def to_dict(self, include_result=True):
+        data = {
+            'job_id': self.id,
+            'url': self.url,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+        if include_result and self.result is not None:
+            data['results'] = self.result
+        return data
+
+class JobManager:
+    """Runs scans on a bounded worker pool and tracks them by job id"""
+
+    def __init__(self, scan_func, max_workers=4, max_queue=100, max_finished=500):
+        self.scan_func = scan_func  # scan_func(url, cancel_event=..., **options) -> results dict
+        self.max_queue = max_queue
+        self.max_finished = max_finished
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='scan-job')
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+
+    def submit(self, url, **options):
+        """Queue a scan and return its job immediately"""
+        job = ScanJob(url, options)
+        with self.lock:
+            queued = sum(1 for existing in self.jobs.values() if existing.status == 'queued')
+            if queued >= self.max_queue:
+                raise QueueFullError(f'Scan queue is full ({self.max_queue} jobs waiting)')
+            self.jobs[job.id] = job
+            self._prune()
+            job.future = self.executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancel a job; queued jobs never start, running ones stop waiting on their checkers"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.finished:
+                return job
+            job.cancel_event.set()
+            if job.future.cancel():
+                self._finish(job, 'cancelled')
+        return job
+
+    def stats(self):
+        with self.lock:
+            counts = {'queued': 0, 'running': 0, 'completed': 0, 'failed': 0, 'cancelled': 0}
+            for job in self.jobs.values():
+                counts[job.status] += 1
+            return counts
+
+    def _run(self, job):
+        with self.lock:
+            if job.cancel_event.is_set():
+                # Cancelled after a worker took it but before it started
+                if not job.finished:
+                    self._finish(job, 'cancelled')
+                return
+            job.status = 'running'
+            job.started_at = datetime.datetime.now().isoformat()
+
+        try:
+            result = self.scan_func(job.url, cancel_event=job.cancel_event, **job.options)
+        except Exception as e:
+            result = {'error': f'Scan failed: {str(e)}', 'url': job.url}
+
+        with self.lock:
+            if job.cancel_event.is_set():
+                self._finish(job, 'cancelled')
+            else:
+                job.result = result
+                self._finish(job, 'failed' if 'error' in result else 'completed')
+
+    def _finish(self, job, status):
+        job.status = status
+        job.finished_at = datetime.datetime.now().isoformat()
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond max_finished"""
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self.jobs[job_id]
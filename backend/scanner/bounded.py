@@ -0,0 +1,33 @@
+import itertools
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+def bounded_map(func, items, concurrency=10):
+    """Apply func to items concurrently, yielding (item, result) as each completes
+
+    items is consumed lazily: at most twice `concurrency` of them are pulled
+    from the iterable at any time, so arbitrarily long generators (e.g. a
+    wordlist streamed from disk) run in constant memory. Exceptions raised
+    by func propagate to the caller.
+    """
+    items = iter(items)
+    window = max(1, concurrency) * 2
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency))
+    pending = {}
+
+    try:
+        for item in itertools.islice(items, window):
+            pending[executor.submit(func, item)] = item
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                # Refill before yielding so workers stay busy while the
+                # caller processes this result
+                for next_item in itertools.islice(items, 1):
+                    pending[executor.submit(func, next_item)] = next_item
+                yield item, future.result()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
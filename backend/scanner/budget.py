@@ -0,0 +1,116 @@
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from scanner.bounded import bounded_map
+
+class BudgetExhausted(Exception):
+    """Raised when a request would exceed the scan's request or time budget"""
+
+class ScanBudget:
+    """Request and wall-clock allowance of one check within a scan"""
+
+    def __init__(self, max_requests=600, time_budget=90):
+        self.max_requests = max_requests
+        self.deadline = time.monotonic() + time_budget
+        self.spent = 0
+        self._lock = threading.Lock()
+
+    def spend(self, requests=1):
+        """Account for requests about to be sent; raises BudgetExhausted if they do not fit"""
+        with self._lock:
+            if self.spent + requests > self.max_requests or time.monotonic() >= self.deadline:
+                raise BudgetExhausted(f'Budget of {self.max_requests} requests exhausted after {self.spent}')
+            self.spent += requests
+
+    @property
+    def exhausted(self):
+        return self.spent >= self.max_requests or time.monotonic() >= self.deadline
+
+class HostSlots:
+    """Per-host concurrency limit shared by every check in the process
+
+    A host's semaphore lives only while requests hold or wait for its
+    slots, so hosts that were scanned once do not accumulate.
+    """
+
+    def __init__(self, per_host=4):
+        self.per_host = per_host
+        self._semaphores = {}  # host -> [semaphore, holders and waiters]
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, url):
+        """Hold one of the host's slots for the duration of the block"""
+        host = (urlparse(url).hostname or '').lower()
+        with self._lock:
+            entry = self._semaphores.get(host)
+            if entry is None:
+                entry = self._semaphores[host] = [threading.BoundedSemaphore(self.per_host), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._semaphores[host]
+
+_host_slots = HostSlots()
+
+class BudgetedSession:
+    """Transport wrapper that charges every request to a ScanBudget and a host slot"""
+
+    def __init__(self, session, budget, host_slots=None):
+        self.session = session
+        self.budget = budget
+        self.host_slots = host_slots or _host_slots
+
+    def request(self, method, url, **kwargs):
+        self.budget.spend()
+        with self.host_slots.slot(url):
+            return self.session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def head(self, url, **kwargs):
+        kwargs.setdefault('allow_redirects', False)
+        return self.request('HEAD', url, **kwargs)
+
+    def post(self, url, data=None, **kwargs):
+        return self.request('POST', url, data=data, **kwargs)
+
+class BudgetScheduler:
+    """Runs test units in parallel until the scan budget runs out
+
+    Units are consumed lazily, so callers should order them breadth-first
+    (e.g. the first payload for every parameter before the second one):
+    coverage then grows with the budget instead of being cut off at a
+    fixed slice. Units left when the budget is exhausted are skipped and
+    counted in `skipped`.
+    """
+
+    def __init__(self, budget, concurrency=8):
+        self.budget = budget
+        self.concurrency = concurrency
+        self.completed = 0
+        self.skipped = 0
+
+    def run(self, func, units):
+        """Call func(unit) for each unit; yields (unit, result) for units that ran to completion"""
+        def run_unit(unit):
+            if self.budget.exhausted:
+                return False, None
+            try:
+                return True, func(unit)
+            except BudgetExhausted:
+                return False, None
+
+        for unit, (completed, result) in bounded_map(run_unit, units, self.concurrency):
+            if completed:
+                self.completed += 1
+                yield unit, result
+            else:
+                self.skipped += 1
@@ -0,0 +1,233 @@
+import hashlib
+import math
+import threading
+import time
+from urllib.parse import urljoin, urlparse, urlunparse, parse_qsl
+from scanner.transport import get_transport
+from scanner.bounded import bounded_map
+from scanner.streaming import BodyReader, release
+from scanner.forms import FormParser, get_page
+
+# Links to these are never fetched as pages
+STATIC_EXTENSIONS = (
+    '.css', '.js', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico', '.webp', '.bmp',
+    '.woff', '.woff2', '.ttf', '.eot', '.pdf', '.zip', '.gz', '.tar', '.rar', '.7z',
+    '.mp3', '.mp4', '.avi', '.mov', '.webm', '.exe', '.dmg', '.iso', '.doc', '.docx',
+    '.xls', '.xlsx', '.ppt', '.pptx'
+)
+
+# Field types that carry no user input worth injecting into
+NON_INJECTABLE_TYPES = ('submit', 'button', 'reset', 'image', 'file')
+
+class BloomFilter:
+    """Fixed-size set membership with a bounded false-positive rate
+
+    Uses about 1.8 bytes per item at the default 0.1% error rate, however long the
+    items are. A false positive only means a URL is wrongly treated as
+    seen.
+    """
+
+    def __init__(self, capacity=100000, error_rate=0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self._lock = threading.Lock()
+
+    def add(self, item):
+        """Add item; returns True if it was not (as far as the filter can tell) present"""
+        positions = self._positions(item)
+        with self._lock:
+            added = False
+            for position in positions:
+                byte, bit = divmod(position, 8)
+                if not self.bits[byte] & (1 << bit):
+                    self.bits[byte] |= 1 << bit
+                    added = True
+            return added
+
+    def __contains__(self, item):
+        return all(self.bits[position // 8] & (1 << (position % 8)) for position in self._positions(item))
+
+    def _positions(self, item):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+class AttackSurface:
+    """Deduplicated index of the endpoints and parameters found on a site
+
+    Each endpoint is {'method', 'action', 'inputs', 'source', 'page'}:
+    action is the absolute URL requests go to (without the query for
+    links), inputs the list of {'name', 'type', 'value'} parameters, and
+    source is 'link' or 'form'. Endpoints are unique by method, action and
+    parameter names, so /item?id=1 and /item?id=2 are one endpoint.
+    """
+
+    def __init__(self, max_endpoints=500):
+        self.max_endpoints = max_endpoints
+        self.endpoints = []
+        self._keys = set()
+        self._lock = threading.Lock()
+
+    def add_link(self, url, page=None):
+        """Record the query parameters of a link"""
+        parsed = urlparse(url)
+        params = parse_qsl(parsed.query, keep_blank_values=True)
+        if not params:
+            return
+        inputs = []
+        for name, value in params:
+            if all(field['name'] != name for field in inputs):
+                inputs.append({'name': name, 'type': 'text', 'value': value})
+        action = urlunparse(parsed._replace(query='', fragment=''))
+        self._add({'method': 'GET', 'action': action, 'inputs': inputs, 'source': 'link', 'page': page or url})
+
+    def add_form(self, form, page):
+        """Record a form found on page"""
+        if not form['inputs']:
+            return
+        action = urljoin(page, form['action']).split('#', 1)[0]
+        self._add({'method': form['method'], 'action': action, 'inputs': form['inputs'],
+                   'source': 'form', 'page': page})
+
+    def parameters(self):
+        """Yield (endpoint, field) once per unique method, action and parameter name"""
+        seen = set()
+        for endpoint in list(self.endpoints):
+            for field in endpoint['inputs']:
+                key = (endpoint['method'], endpoint['action'], field['name'])
+                if field['type'] in NON_INJECTABLE_TYPES or key in seen:
+                    continue
+                seen.add(key)
+                yield endpoint, field
+
+    def __len__(self):
+        return len(self.endpoints)
+
+    def _add(self, endpoint):
+        key = (endpoint['method'], endpoint['action'],
+               frozenset(field['name'] for field in endpoint['inputs']))
+        with self._lock:
+            if key in self._keys or len(self.endpoints) >= self.max_endpoints:
+                return
+            self._keys.add(key)
+            self.endpoints.append(endpoint)
+
+class Crawler:
+    """Same-origin breadth-first crawler that builds an AttackSurface
+
+    Each depth level is fetched concurrently (at most `concurrency`
+    requests in flight). Pages are deduplicated by shape (path plus
+    parameter names) through a Bloom filter, so a catalogue of
+    /item?id=1..100000 costs one fetch and a few bits per distinct URL.
+    Crawling stops at max_depth links from the start page, max_pages
+    fetched pages or time_budget seconds, whichever comes first.
+    """
+
+    def __init__(self, session=None, max_depth=2, max_pages=50, time_budget=20, concurrency=5,
+                 timeout=10, max_page_bytes=2 * 1024 * 1024):
+        self.session = session or get_transport()
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.time_budget = time_budget
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.max_page_bytes = max_page_bytes
+
+    def crawl(self, start_url, cache=None):
+        """Crawl from start_url and return its AttackSurface"""
+        surface = AttackSurface()
+        seen = BloomFilter()
+        deadline = time.monotonic() + self.time_budget
+        origin = self._origin(start_url)
+
+        surface.add_link(start_url)
+        seen.add(self._shape(start_url))
+        frontier = [start_url]
+        pages = 0
+
+        for depth in range(self.max_depth + 1):
+            if not frontier or time.monotonic() >= deadline:
+                break
+            frontier = frontier[:self.max_pages - pages]
+            pages += len(frontier)
+
+            next_frontier = []
+            fetch = lambda url: self._fetch(url, cache if url == start_url else None, deadline)
+            for url, page in bounded_map(fetch, frontier, self.concurrency):
+                if page is None:
+                    continue
+                page_url, forms, links = page
+                for form in forms:
+                    surface.add_form(form, page_url)
+                for link in links:
+                    target = self._normalize(urljoin(page_url, link))
+                    if not target or self._origin(target) != origin:
+                        continue
+                    surface.add_link(target, page_url)
+                    if (depth < self.max_depth and not self._is_static(target)
+                            and seen.add(self._shape(target))):
+                        next_frontier.append(target)
+                if time.monotonic() >= deadline:
+                    break
+            frontier = next_frontier
+
+            if pages >= self.max_pages:
+                break
+
+        return surface
+
+    def _fetch(self, url, cache, deadline):
+        """Fetch a page and return (final url, forms, links), or None if it is not crawlable HTML"""
+        if time.monotonic() >= deadline:
+            return None
+        try:
+            if cache is not None:
+                # The start page is shared with the other checkers
+                page = get_page(cache, self.session, url, self.timeout)
+                return url, page['forms'], page['links']
+
+            response = self.session.get(url, timeout=self.timeout, stream=True)
+            try:
+                if (response.status_code != 200
+                        or 'html' not in response.headers.get('Content-Type', '').lower()
+                        or self._origin(response.url) != self._origin(url)):
+                    return None
+                parser = FormParser()
+                for text in BodyReader(response, self.max_page_bytes).texts():
+                    parser.feed(text)
+                return response.url, parser.close(), parser.links
+            finally:
+                release(response)
+        except Exception:
+            return None
+
+    def _normalize(self, url):
+        """Absolute http(s) URL without fragment and with a lower-case origin, or None"""
+        parsed = urlparse(url)
+        if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+            return None
+        netloc = parsed.hostname
+        if parsed.port and parsed.port != {'http': 80, 'https': 443}[parsed.scheme]:
+            netloc = f'{netloc}:{parsed.port}'
+        return urlunparse((parsed.scheme, netloc, parsed.path or '/', parsed.params, parsed.query, ''))
+
+    def _origin(self, url):
+        parsed = urlparse(url)
+        default_port = {'http': 80, 'https': 443}.get(parsed.scheme)
+        return parsed.scheme, (parsed.hostname or '').lower(), parsed.port or default_port
+
+    def _shape(self, url):
+        """Dedup key of a page: its path and sorted parameter names, ignoring values"""
+        parsed = urlparse(url)
+        names = sorted({name for name, _ in parse_qsl(parsed.query, keep_blank_values=True)})
+        return f'{parsed.path}?{"&".join(names)}'
+
+    def _is_static(self, url):
+        return urlparse(url).path.lower().endswith(STATIC_EXTENSIONS)
+
+def get_attack_surface(cache, session, url):
+    """The attack surface reachable from url, crawled once per scan and shared by every checker"""
+    return cache.memoize(('attack-surface', url), lambda: Crawler(session).crawl(url, cache))
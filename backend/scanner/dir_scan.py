@@ -1,9 +1,11 @@
-import requests
 from urllib.parse import urljoin
 import time
+from scanner.transport import get_transport
+from scanner.bounded import bounded_map
+from scanner.path_probe import PathProbe
 
 class DirectoryScanner:
-    def __init__(self):
+    def __init__(self, wordlist=None, concurrency=10):
         self.common_dirs = [
             'admin', 'admin.php', 'administrator', 'wp-admin',
             'backup', 'backups', 'config', 'database',
@@ -15,50 +17,51 @@ class DirectoryScanner:
             'robots.txt', 'sitemap.xml', '.htaccess',
             '.env', '.git', '.svn', 'composer.json'
         ]
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        # Optional wordlist file, streamed line by line instead of common_dirs
+        self.wordlist = wordlist
+        self.concurrency = concurrency
+        self.session = get_transport()
     
-    def check(self, url):
+    def register_probes(self, probe):
+        """Register the built-in paths with a shared path probe"""
+        if not self.wordlist:
+            probe.register(self.common_dirs)
+    
+    def check(self, url, probe=None):
         """Scan for common directories and files"""
         vulnerabilities = []
         found_dirs = []
+        if probe is None:
+            probe = PathProbe(self.session, self.concurrency)
+            self.register_probes(probe)
         
         try:
-            # Get base response for comparison
-            try:
-                base_response = self.session.get(url, timeout=10)
-                base_status = base_response.status_code
-            except:
-                base_status = 404
+            base_url = url.rstrip('/') + '/'
+            probed = 0
+            started = time.monotonic()
+            
+            # Paths shared with other modules are fetched once by the probe
+            outcomes = probe.run(url)
             
-            for directory in self.common_dirs:
-                test_url = urljoin(url.rstrip('/') + '/', directory)
-                
-                try:
-                    response = self.session.get(test_url, timeout=5, allow_redirects=False)
-                    
-                    # Check for interesting responses
-                    if response.status_code in [200, 301, 302, 403]:
-                        severity = self._assess_severity(directory, response.status_code)
-                        found_dirs.append({
-                            'url': test_url,
-                            'status': response.status_code,
-                            'directory': directory,
-                            'severity': severity
-                        })
-                
-                except:
-                    continue
-                
-                time.sleep(0.1)  # Rate limiting
+            for (index, directory), found_dir in bounded_map(
+                    lambda item: self._probe(base_url, item[1], probe, outcomes),
+                    enumerate(self._iter_paths()), self.concurrency):
+                probed += 1
+                if found_dir:
+                    found_dirs.append((index, found_dir))
+            
+            # Probes finish out of order; report in wordlist order
+            found_dirs = [found_dir for _, found_dir in sorted(found_dirs, key=lambda item: item[0])]
             
             # Generate vulnerability reports
             for found_dir in found_dirs:
                 vulnerability = self._create_vulnerability_report(found_dir)
                 if vulnerability:
                     vulnerabilities.append(vulnerability)
+            
+            if self.wordlist:
+                elapsed = time.monotonic() - started
+                vulnerabilities.append(self._throughput_report(probed, len(found_dirs), elapsed))
         
         except Exception as e:
             vulnerabilities.append({
@@ -70,6 +73,54 @@ class DirectoryScanner:
         
         return vulnerabilities
     
+    def _iter_paths(self):
+        """Yield candidate paths, streaming the wordlist from disk if configured"""
+        if not self.wordlist:
+            yield from self.common_dirs
+            return
+        
+        with open(self.wordlist, encoding='utf-8', errors='ignore') as wordlist:
+            for line in wordlist:
+                path = line.strip().lstrip('/')
+                if path and not path.startswith('#'):
+                    yield path
+    
+    def _probe(self, base_url, directory, probe, outcomes):
+        """Get the status of a single path and describe it if it is interesting"""
+        test_url = urljoin(base_url, directory)
+        
+        if directory in probe:
+            outcome = outcomes.get(directory)
+        else:
+            # Only the status matters, so the body is not downloaded
+            outcome = probe.probe_path(base_url, directory)
+        
+        # Paths answered like a random missing one are not findings
+        if not outcome or outcome.get('soft_404'):
+            return None
+        status = outcome['status']
+        
+        # Check for interesting responses
+        if status in [200, 301, 302, 403]:
+            return {
+                'url': test_url,
+                'status': status,
+                'directory': directory,
+                'severity': self._assess_severity(directory, status)
+            }
+        return None
+    
+    def _throughput_report(self, probed, found, elapsed):
+        """Summarize a wordlist run"""
+        rate = probed / elapsed if elapsed > 0 else probed
+        return {
+            'type': 'Directory Scan Statistics',
+            'severity': 'info',
+            'description': f'Probed {probed} paths in {elapsed:.1f}s ({rate:.1f} requests/s), {found} responded',
+            'details': f'Wordlist: {self.wordlist}, concurrency: {self.concurrency}',
+            'recommendation': 'Increase concurrency for faster scans of robust targets'
+        }
+    
     def _assess_severity(self, directory, status_code):
         """Assess the severity of a found directory"""
         high_risk_dirs = [
@@ -0,0 +1,313 @@
+import re
+from html import unescape
+
+_TAG_NAME = re.compile(r'[a-zA-Z][^\s/>]*')
+_SPACE = re.compile(r'[\s/]*')
+_ATTRIBUTE_NAME = re.compile(r'=?[^\s/>=]*')
+_UNQUOTED_VALUE = re.compile(r'[^\s>]*')
+_SPACE_ONLY = re.compile(r'[ \t\n\r\f]*')
+# Elements whose content is raw text up to the matching end tag
+_RAW_TEXT = {name: re.compile(rf'</{name}(?=[\s/>])', re.IGNORECASE)
+             for name in ('script', 'style', 'textarea', 'title', 'xmp', 'noembed', 'noframes')}
+
+# Fields a form submits, by tag
+FIELD_TAGS = ('input', 'textarea', 'select', 'button')
+# Tags and attributes that link to other pages
+LINK_ATTRIBUTES = {'a': 'href', 'area': 'href', 'frame': 'src', 'iframe': 'src'}
+
+class FormParser:
+    """Incremental, linear-time extractor of HTML forms and their fields
+
+    Text is fed in chunks as it arrives. The parser jumps from '<' to '<'
+    with str.find and keeps its place inside comments, raw text and
+    unfinished tags across chunks, so no character is scanned more than a
+    bounded number of times and pathological markup (thousands of unclosed
+    '</', giant comments) costs no more than ordinary markup; html.parser
+    does not guarantee that on every Python version. A tag still open
+    after max_tag characters is dropped.
+
+    Each form is {'action', 'method', 'inputs'}, with inputs a list of
+    {'name', 'type', 'value'}. action is the raw attribute ('' submits to
+    the page itself) and method is upper-case. The raw targets of the
+    first max_links links are collected in `links`.
+    """
+
+    def __init__(self, max_tag=64 * 1024, max_links=1000):
+        self.max_tag = max_tag
+        self.max_links = max_links
+        self.forms = []
+        self.links = []
+        self._buffer = ''
+        self._form = None
+        self._select = None  # Open <select> field, valued by its selected or first option
+        self._selected = False  # Whether the open select has seen a selected option
+        self._option = None  # [value, text parts, selected] of the open <option>
+        self._skip = None  # Terminator of the comment or end tag being skipped
+        self._raw = None  # (tag name, attrs, end pattern, text parts) inside raw text
+        self._tag = None  # (name, attrs, offset, quote search offset) of an unfinished start tag
+
+    def feed(self, data):
+        self._buffer += data
+        self._parse(final=False)
+
+    def close(self):
+        """Finish parsing; returns the list of forms"""
+        self._parse(final=True)
+        self._buffer = ''
+        self._end_form()
+        return self.forms
+
+    def _parse(self, final):
+        buffer = self._buffer
+        pos = 0
+        size = len(buffer)
+
+        while pos < size:
+            if self._skip:
+                index = buffer.find(self._skip, pos)
+                if index < 0:
+                    # Keep only what could be the start of the terminator
+                    pos = size if final else max(pos, size - len(self._skip) + 1)
+                    break
+                pos = index + len(self._skip)
+                self._skip = None
+                continue
+
+            if self._raw:
+                name, attrs, end_pattern, parts = self._raw
+                match = end_pattern.search(buffer, pos)
+                if not match:
+                    # The end tag may straddle chunks, so hold back its length
+                    cut = size if final else max(pos, size - len(name) - 3)
+                    parts.append(buffer[pos:cut])
+                    pos = cut
+                    break
+                parts.append(buffer[pos:match.start()])
+                self._raw = None
+                self._raw_text(name, attrs, ''.join(parts))
+                pos = match.start()
+                continue
+
+            lt = buffer.find('<', pos)
+            if lt < 0:
+                self._text(buffer[pos:])
+                pos = size
+                break
+            if lt > pos:
+                self._text(buffer[pos:lt])
+                pos = lt
+
+            end = self._token(buffer, pos, final)
+            if end is None:
+                break  # Incomplete; wait for more data
+            pos = end
+
+        if final:
+            if self._raw:
+                name, attrs, _, parts = self._raw
+                self._raw = None
+                self._raw_text(name, attrs, ''.join(parts))
+            pos = size
+        self._buffer = buffer[pos:]
+
+    def _token(self, buffer, pos, final):
+        """Handle the markup at buffer[pos] == '<'; returns where to continue or None if incomplete"""
+        size = len(buffer)
+        if self._tag is None:
+            lookahead = buffer[pos:pos + 4]
+            if not final and len(lookahead) < 4 and (lookahead in ('<', '</') or '<!--'.startswith(lookahead)):
+                return None
+
+            if lookahead == '<!--':
+                self._skip = '-->'
+                return pos + 4
+            following = lookahead[1:2]
+            if following and following in '!?':
+                self._skip = '>'
+                return pos + 2
+            if following == '/':
+                match = _TAG_NAME.match(buffer, pos + 2)
+                if match and match.end() >= size and not final:
+                    return None  # The name may continue in the next chunk
+                if match:
+                    self._end_tag(match.group().lower())
+                self._skip = '>'
+                return match.end() if match else pos + 2
+            # Only an ASCII letter opens a tag (as _TAG_NAME expects); '<é' is text
+            if not (following.isascii() and following.isalpha()):
+                self._text('<')
+                return pos + 1
+
+        tag = self._start_tag(buffer, pos)
+        if tag is None:
+            if final or size - pos > self.max_tag:
+                self._tag = None
+                return size  # EOF inside a tag, or a runaway tag: drop it
+            return None
+        end, name, attrs = tag
+        self._handle_start(name, attrs)
+        return end
+
+    def _start_tag(self, buffer, pos):
+        """Parse the start tag at pos into (end, name, attrs), or None if it is incomplete
+
+        Progress on an incomplete tag is kept in self._tag, so the next
+        attempt resumes at the unfinished attribute instead of the '<'.
+        """
+        size = len(buffer)
+        if self._tag is not None:
+            name, attrs, offset, quote_from = self._tag
+            i = pos + offset
+        else:
+            match = _TAG_NAME.match(buffer, pos + 1)
+            if match.end() >= size:
+                return None  # The name may continue in the next chunk
+            name = match.group().lower()
+            attrs = {}
+            i = match.end()
+            quote_from = 0
+
+        while True:
+            i = _SPACE.match(buffer, i).end()
+            if i >= size:
+                self._tag = (name, attrs, i - pos, 0)
+                return None
+            if buffer[i] == '>':
+                self._tag = None
+                return i + 1, name, attrs
+
+            start = i
+            match = _ATTRIBUTE_NAME.match(buffer, i)
+            attribute = match.group().lower()
+            i = _SPACE_ONLY.match(buffer, match.end()).end()
+            value = ''
+            if i < size and buffer[i] == '=':
+                i = _SPACE_ONLY.match(buffer, i + 1).end()
+                if i < size and buffer[i] in '"\'':
+                    close = buffer.find(buffer[i], max(i + 1, pos + quote_from))
+                    if close < 0:
+                        self._tag = (name, attrs, start - pos, size - pos)
+                        return None
+                    value = buffer[i + 1:close]
+                    i = close + 1
+                else:
+                    value_start = i
+                    i = _UNQUOTED_VALUE.match(buffer, i).end()
+                    value = buffer[value_start:i]
+            if i >= size:
+                # The attribute may continue in the next chunk
+                self._tag = (name, attrs, start - pos, 0)
+                return None
+            quote_from = 0
+            if attribute and attribute not in attrs:
+                attrs[attribute] = unescape(value)
+
+    def _handle_start(self, name, attrs):
+        if name in _RAW_TEXT:
+            self._raw = (name, attrs, _RAW_TEXT[name], [])
+            return
+
+        if name in LINK_ATTRIBUTES:
+            target = attrs.get(LINK_ATTRIBUTES[name], '').strip()
+            if target and len(self.links) < self.max_links:
+                self.links.append(target)
+
+        if name == 'form':
+            # Nested forms are ignored, as browsers do
+            if self._form is None:
+                self._form = {
+                    'action': attrs.get('action', '').strip(),
+                    'method': (attrs.get('method') or 'GET').strip().upper(),
+                    'inputs': []
+                }
+            return
+        if self._form is None:
+            return
+
+        if name == 'option' and self._select is not None:
+            self._end_option()
+            self._option = [attrs.get('value'), [], 'selected' in attrs]
+        elif name in FIELD_TAGS:
+            self._end_select()
+            field = {
+                'name': attrs.get('name', ''),
+                'type': (attrs.get('type') or ('submit' if name == 'button' else 'text')).lower()
+                        if name in ('input', 'button') else name,
+                'value': attrs.get('value', '')
+            }
+            if name == 'select':
+                field['value'] = None
+                self._select = field
+                self._selected = False
+            if field['name']:
+                self._form['inputs'].append(field)
+
+    def _end_tag(self, name):
+        if name == 'form':
+            self._end_form()
+        elif name == 'select':
+            self._end_select()
+        elif name == 'option':
+            self._end_option()
+
+    def _text(self, text):
+        if self._option is not None:
+            self._option[1].append(text)
+
+    def _raw_text(self, name, attrs, text):
+        # <textarea> is the only raw-text element that carries a field value
+        if name == 'textarea' and self._form is not None:
+            self._end_select()
+            if attrs.get('name'):
+                self._form['inputs'].append({'name': attrs['name'], 'type': 'textarea',
+                                             'value': unescape(text)})
+
+    def _end_option(self):
+        """Close the open option; the first one, or the first selected one, values the select"""
+        option, self._option = self._option, None
+        if option is None or self._select is None:
+            return
+        value, text, selected = option
+        if self._select['value'] is None or (selected and not self._selected):
+            self._select['value'] = value if value is not None else unescape(''.join(text)).strip()
+        self._selected = self._selected or selected
+
+    def _end_select(self):
+        self._end_option()
+        if self._select is not None:
+            if self._select['value'] is None:
+                self._select['value'] = ''
+            self._select = None
+
+    def _end_form(self):
+        self._end_select()
+        if self._form is not None:
+            self.forms.append(self._form)
+            self._form = None
+
+def extract_page(html, chunk_size=64 * 1024):
+    """Extract {'forms', 'links'} from an HTML string or an iterable of text chunks"""
+    parser = FormParser()
+    if isinstance(html, str):
+        chunks = (html[i:i + chunk_size] for i in range(0, len(html), chunk_size))
+    else:
+        chunks = html
+    for chunk in chunks:
+        parser.feed(chunk)
+    forms = parser.close()
+    return {'forms': forms, 'links': parser.links}
+
+def extract_forms(html, chunk_size=64 * 1024):
+    """Extract the forms from an HTML string or an iterable of text chunks"""
+    return extract_page(html, chunk_size)['forms']
+
+def get_page(cache, session, url, timeout=10):
+    """Forms and links of the page at url, extracted once per scan and shared by every checker"""
+    def extract():
+        response = cache.get(session, url, timeout=timeout)
+        return cache.analyze('page', url, response, lambda response: extract_page(response.text))
+    return cache.memoize(('page', url), extract)
+
+def get_forms(cache, session, url, timeout=10):
+    """The forms on the page at url, extracted once per scan and shared by every checker"""
+    return get_page(cache, session, url, timeout)['forms']
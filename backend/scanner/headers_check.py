@@ -1,9 +1,12 @@
 import requests
 from urllib.parse import urlparse
+from scanner.response_cache import ResponseCache
+from scanner.transport import get_transport
 
 class HeadersChecker:
     def __init__(self):
         self.timeout = 10
+        self.session = get_transport()
         self.required_headers = {
             'content-security-policy': {
                 'severity': 'high',
@@ -49,12 +52,13 @@ class HeadersChecker:
             }
         }
     
-    def check(self, url):
+    def check(self, url, cache=None):
         """Check for security headers"""
         vulnerabilities = []
+        cache = cache or ResponseCache()
         
         try:
-            response = requests.get(url, timeout=self.timeout, allow_redirects=True)
+            response = cache.get(self.session, url, timeout=self.timeout, allow_redirects=True)
             headers = {k.lower(): v for k, v in response.headers.items()}
             
             # Check for missing security headers
@@ -0,0 +1,92 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+class MemoryStateStore:
+    """In-process resource state, bounded to the most recently used entries"""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            state = self._entries.get(key)
+            if state is not None:
+                self._entries.move_to_end(key)
+            return state
+
+    def put(self, key, state):
+        with self._lock:
+            self._entries[key] = state
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+class IncrementalState:
+    """Remembers validators, body hashes and analysis results per resource between scans
+
+    Results must be JSON-serialisable (findings, form lists, ...) so the
+    store can be persistent.
+    """
+
+    def __init__(self, store=None):
+        self.store = store or MemoryStateStore()
+        self.reused = 0
+        self.analyzed = 0
+
+    def conditional_headers(self, namespace, url):
+        """If-None-Match / If-Modified-Since headers from the previous scan of url"""
+        prior = self.store.get(self._key(namespace, url))
+        headers = {}
+        if prior:
+            if prior.get('etag'):
+                headers['If-None-Match'] = prior['etag']
+            if prior.get('last_modified'):
+                headers['If-Modified-Since'] = prior['last_modified']
+        return headers
+
+    def analyze(self, namespace, url, response, analyze, hash_body=True):
+        """Return analyze(response), or the previous result if the resource is unchanged
+
+        Pass hash_body=False for streamed responses whose body must not be
+        read up front; those are only recognised as unchanged by a 304 or
+        by validators identical to the previous scan's.
+        """
+        key = self._key(namespace, url)
+        prior = self.store.get(key)
+
+        if prior is not None and response.status_code == 304:
+            self.reused += 1
+            return prior['result']
+
+        validators = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified')
+        }
+
+        if not hash_body:
+            if (prior is not None and any(validators.values())
+                    and all(prior.get(name) == value for name, value in validators.items())):
+                self.reused += 1
+                return prior['result']
+            self.analyzed += 1
+            result = analyze(response)
+            self.store.put(key, dict(validators, hash=None, result=result))
+            return result
+
+        body_hash = hashlib.sha256(response.content or b'').hexdigest()
+        if prior is not None and prior.get('hash') == body_hash:
+            self.reused += 1
+            if any(prior.get(name) != value for name, value in validators.items()):
+                self.store.put(key, dict(prior, **validators))
+            return prior['result']
+
+        self.analyzed += 1
+        result = analyze(response)
+        self.store.put(key, dict(validators, hash=body_hash, result=result))
+        return result
+
+    def _key(self, namespace, url):
+        return f'{namespace} {url}'
@@ -0,0 +1,193 @@
+import re
+import threading
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+# Leading global inline flags such as "(?i)", rewritten as a scoped group
+# so patterns can be joined into one alternation
+_GLOBAL_FLAGS = re.compile(r'^\(\?([aiLmsux]+)\)')
+
+class PatternSet:
+    """A named set of regexes matched in a single pass over the text
+
+    Every pattern is compiled once, alone and into a combined alternation
+    of named groups, so search() scans a body once rather than once per
+    pattern. Before that, a literal prefilter drops patterns whose required
+    literal text (e.g. "mysql" for r"sql syntax.*mysql") does not occur in
+    the body; if no pattern survives, the regex engine never runs.
+    findall() and iter_matches() scan once per surviving pattern instead,
+    as one alternation never reports overlapping matches of two patterns.
+
+    Patterns may be a dict {name: pattern} or a list of patterns or
+    (name, pattern) pairs; names need not be unique. Patterns must not use
+    numbered backreferences, as their groups are renumbered when combined.
+
+    With lowercase=True the patterns are taken to be written in lower case
+    and are matched case-sensitively against the lower-cased text, which is
+    many times faster than re.IGNORECASE on large bodies.
+    """
+
+    def __init__(self, patterns, flags=0, lowercase=False, max_combinations=256):
+        if isinstance(patterns, dict):
+            patterns = patterns.items()
+        self.flags = flags
+        self.lowercase = lowercase
+        self._fold = str.lower if lowercase else str.casefold
+        self.max_combinations = max_combinations
+        self.names = []
+        self._sources = []
+        self._regexes = []
+        self._group_counts = []
+        self._literals = []  # Per pattern: sets of folded strings, one of each must occur
+        for entry in patterns:
+            name, pattern = entry if isinstance(entry, tuple) else (entry, entry)
+            compiled = re.compile(pattern, flags)
+            self.names.append(name)
+            self._sources.append(self._scoped(pattern))
+            self._regexes.append(compiled)
+            self._group_counts.append(compiled.groups)
+            self._literals.append(self._required_literals(pattern, flags))
+        self._combined = {}
+        self._lock = threading.Lock()
+
+    def search(self, text):
+        """Return (name, matched text) for the leftmost match in text, or None"""
+        candidates, haystack = self._candidates(text)
+        if not candidates:
+            return None
+        regex, groups = self._compiled(candidates)
+        match = regex.search(haystack)
+        if match is None:
+            return None
+        index = groups[match.lastgroup]
+        return self.names[index], self._value(match, regex.groupindex[match.lastgroup], text, haystack)
+
+    def findall(self, text):
+        """Return {name: [matches]} for every pattern that matched
+
+        Each list follows re.findall conventions for its own pattern (whole
+        match, the single group, or a tuple of groups), so matches of
+        different patterns may overlap (an email inside a password line is
+        reported under both).
+        """
+        found = {}
+        for name, value, _ in self.iter_matches(text):
+            found.setdefault(name, []).append(value)
+        return found
+
+    def iter_matches(self, text):
+        """Yield (name, value, end offset) for each match, with findall-style values, pattern by pattern"""
+        candidates, haystack = self._candidates(text)
+        for index in candidates:
+            count = self._group_counts[index]
+            for match in self._regexes[index].finditer(haystack):
+                if count == 0:
+                    value = self._value(match, 0, text, haystack)
+                else:
+                    values = [self._value(match, number, text, haystack) for number in range(1, count + 1)]
+                    value = values[0] if count == 1 else tuple(values)
+                yield self.names[index], value, match.end()
+
+    def _value(self, match, group, text, haystack):
+        """Text of a group, taken from the original text where offsets line up"""
+        start, end = match.span(group)
+        if start < 0:
+            return ''
+        if haystack is not text and len(haystack) != len(text):
+            return haystack[start:end]
+        return text[start:end]
+
+    def _candidates(self, text):
+        """Return (indexes of the patterns whose required literals all occur, text to match against)"""
+        folded = self._fold(text) if self.lowercase else None
+        seen = {}  # literal -> found, so literals shared by patterns are searched once
+
+        def occurs(literal):
+            found = seen.get(literal)
+            if found is None:
+                found = seen[literal] = literal in folded
+            return found
+
+        candidates = []
+        for index, requirements in enumerate(self._literals):
+            if requirements and folded is None:
+                folded = self._fold(text)
+            if all(any(occurs(literal) for literal in literals) for literals in requirements):
+                candidates.append(index)
+        return tuple(candidates), folded if self.lowercase else text
+
+    def _compiled(self, candidates):
+        """Combined regex for a subset of patterns, compiled once per subset"""
+        combined = self._combined.get(candidates)
+        if combined is None:
+            groups = {f'_p{index}': index for index in candidates}
+            regex = re.compile('|'.join(f'(?P<_p{index}>{self._sources[index]})' for index in candidates),
+                               self.flags)
+            combined = (regex, groups)
+            with self._lock:
+                if len(self._combined) >= self.max_combinations:
+                    self._combined.clear()
+                self._combined[candidates] = combined
+        return combined
+
+    def _scoped(self, pattern):
+        """Rewrite leading global flags "(?i)..." as "(?i:...)" so the pattern can be embedded"""
+        match = _GLOBAL_FLAGS.match(pattern)
+        if not match:
+            return pattern
+        flags = match.group(1)
+        scoped = ''.join(flag for flag in flags if flag in 'imsx')
+        body = pattern[match.end():]
+        return f'(?{scoped}:{body})' if scoped else body
+
+    def _required_literals(self, pattern, flags):
+        """Sets of alternative literals every match of pattern must contain, most selective first"""
+        try:
+            parsed = sre_parse.parse(pattern, flags)
+        except Exception:
+            return []
+        if parsed.state.flags & (re.VERBOSE | re.LOCALE):
+            return []
+        requirements = [frozenset(self._fold(literal) for literal in literals)
+                        for literals in self._requirements(list(parsed))]
+        return sorted(requirements, key=lambda literals: -min(len(literal) for literal in literals))
+
+    def _best_requirement(self, items):
+        """Pick, among the requirements of a parsed sequence, the one with the longest shortest literal"""
+        requirements = self._requirements(items)
+        if not requirements:
+            return None
+        return max(requirements, key=lambda literals: min(len(literal) for literal in literals))
+
+    def _requirements(self, items):
+        """Sets of alternative literals, one of each set appearing in every match of the sequence"""
+        requirements = []
+        run = ''
+        for op, av in items:
+            if op is sre_parse.LITERAL:
+                run += chr(av)
+                continue
+            if run:
+                requirements.append({run})
+                run = ''
+
+            if op is sre_parse.SUBPATTERN:
+                requirements.extend(self._requirements(list(av[-1])))
+            elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] >= 1:
+                requirements.extend(self._requirements(list(av[2])))
+            elif op is sre_parse.BRANCH:
+                alternatives = set()
+                for branch in av[1]:
+                    requirement = self._best_requirement(list(branch))
+                    if not requirement:
+                        alternatives = None
+                        break
+                    alternatives |= requirement
+                if alternatives:
+                    requirements.append(alternatives)
+        if run:
+            requirements.append({run})
+        return requirements
@@ -0,0 +1,187 @@
+import posixpath
+import threading
+from concurrent.futures import Future
+from urllib.parse import urljoin, urlparse
+from scanner.transport import get_transport
+from scanner.bounded import bounded_map
+from scanner.streaming import release
+from scanner.soft404 import Soft404Detector
+
+# Statuses a site may also use for paths that do not exist
+SOFT_404_STATUSES = (200, 301, 302, 303, 307, 308, 401, 403)
+
+class PathProbe:
+    """Per-scan stage that requests each registered path once
+
+    Modules register the paths they care about, optionally with a handler
+    that analyses the response. Every distinct path is fetched a single
+    time and the response is fanned out to each registered handler, so
+    overlapping probe sets cost no extra traffic.
+    
+    Responses are streamed: handlers that need the body read it
+    themselves (see scanner.streaming.BodyReader), so a large file is never
+    downloaded just to learn its status code.
+
+    With head_first, paths are requested with HEAD. Only a 200 for a path
+    with handlers is followed by a GET, and that GET asks for no more than
+    the handlers' max_bytes with a Range header (servers that ignore Range
+    are cut off by streaming). Hosts answering HEAD with 405 or 501 are
+    probed with streamed GETs instead.
+
+    With soft404, random missing paths are sampled at each path's level
+    first (see scanner.soft404). Where the site answers them with a soft
+    status, paths are probed with one ranged GET instead of HEAD, and
+    responses matching the samples are marked soft_404 without further
+    requests or handlers. The probe response is released before any
+    follow-up request, so a worker never holds two connections.
+    """
+
+    def __init__(self, session=None, concurrency=10, timeout=5, incremental=None, head_first=True,
+                 max_body_bytes=1024 * 1024, soft404=True):
+        self.session = session or get_transport()
+        # Optional IncrementalState: paths unchanged since the last scan
+        # reuse their previous handler results
+        self.incremental = incremental
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.head_first = head_first
+        self.max_body_bytes = max_body_bytes  # Body bytes fetched for handlers that set no max_bytes
+        self._no_head = set()  # Hosts that do not support HEAD
+        self.soft404 = Soft404Detector(self.session, timeout) if soft404 else None
+        self._paths = {}  # path -> [(owner, handler, max_bytes)]
+        self._runs = {}
+        self._lock = threading.Lock()
+
+    def register(self, paths, owner=None, handler=None, max_bytes=None):
+        """Add paths to the probe set; handler(path, url, response) results are kept per owner name
+
+        max_bytes is how much of the body the handler reads at most.
+        """
+        for path in paths:
+            entries = self._paths.setdefault(path.lstrip('/'), [])
+            if handler:
+                entries.append((owner, handler, max_bytes))
+
+    def __contains__(self, path):
+        return path.lstrip('/') in self._paths
+
+    def run(self, base_url):
+        """Probe every registered path under base_url, at most once per scan
+
+        Returns {path: {'url', 'status', 'results'}} where results maps each
+        owner to its handler's return value. Callers arriving while the
+        probe is in flight wait for it instead of probing again.
+        """
+        base_url = base_url.rstrip('/') + '/'
+        with self._lock:
+            future = self._runs.get(base_url)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._runs[base_url] = future
+
+        if owner:
+            try:
+                outcomes = {}
+                for path, outcome in bounded_map(lambda path: self._probe(base_url, path),
+                                                 list(self._paths), self.concurrency):
+                    if outcome:
+                        outcomes[path] = outcome
+                future.set_result(outcomes)
+            except Exception as e:
+                future.set_exception(e)
+
+        return future.result()
+
+    def probe_path(self, base_url, path):
+        """Probe one path, registered or not, without running the path set
+
+        Returns {'url', 'status', 'soft_404', 'results'}, or None if the
+        request failed; the body is only downloaded for registered handlers.
+        """
+        return self._probe(base_url.rstrip('/') + '/', path.lstrip('/'))
+
+    def _request_status(self, url, headers=None):
+        """HEAD url, or GET it streamed if HEAD is off or unsupported by the host"""
+        host = urlparse(url).netloc
+        if self.head_first and host not in self._no_head:
+            response = self.session.head(url, timeout=self.timeout, headers=headers)
+            if response.status_code not in (405, 501):
+                return response
+            response.close()
+            self._no_head.add(host)
+        return self.session.get(url, timeout=self.timeout, allow_redirects=False, headers=headers, stream=True)
+
+    def _request_body(self, url, max_bytes):
+        """GET the first max_bytes + 1 bytes of url (one extra, so handlers can tell the body was cut)"""
+        return self.session.get(url, timeout=self.timeout, allow_redirects=False, stream=True,
+                                headers={'Range': f'bytes=0-{max_bytes}'})
+
+    def _probe(self, base_url, path):
+        """Fetch one path and hand the response to each interested handler"""
+        url = urljoin(base_url, path)
+        headers = self.incremental.conditional_headers('path-probe', url) if self.incremental else None
+        try:
+            # Sampled before the probe takes a connection of its own
+            signatures = self.soft404.signatures(base_url, path) if self.soft404 else frozenset()
+            if any(status in SOFT_404_STATUSES for status, _, _ in signatures):
+                response = self.soft404.request(url, headers)
+            else:
+                signatures = None
+                response = self._request_status(url, headers)
+        except Exception:
+            return None
+
+        handle = lambda response: self._handle(path, url, response, signatures)
+        try:
+            if self.incremental:
+                outcome = self.incremental.analyze('path-probe', url, response, handle, hash_body=False)
+            else:
+                outcome = handle(response)
+        finally:
+            release(response)
+
+        return dict(outcome, url=url)
+
+    def _handle(self, path, url, response, signatures=None):
+        """Run every handler registered for path on its response
+
+        signatures are the soft-404 signatures of path's level when response
+        came from Soft404Detector.request(), else None.
+        """
+        entries = self._paths.get(path, [])
+        outcome = {'status': response.status_code, 'soft_404': False, 'results': {}}
+        fetch_body = response.request.method == 'HEAD'
+        if signatures is not None:
+            try:
+                fingerprint = self.soft404.fingerprint(response, posixpath.basename(path.rstrip('/')))
+            except Exception:
+                fingerprint = None
+            finally:
+                # Back to the pool before the body GET below
+                release(response)
+            if fingerprint in signatures:
+                outcome['soft_404'] = True
+                return outcome
+            outcome['status'] = self.soft404.status(response)
+            fetch_body = True
+
+        body_response = response
+        if entries and fetch_body and outcome['status'] == 200:
+            # A hit: fetch as much of the body as the handlers will read
+            max_bytes = max(max_bytes or self.max_body_bytes for _, _, max_bytes in entries)
+            try:
+                body_response = self._request_body(url, max_bytes)
+            except Exception:
+                body_response = None
+
+        try:
+            for owner, handler, _ in entries:
+                try:
+                    outcome['results'][owner] = handler(path, url, body_response) if body_response is not None else None
+                except Exception:
+                    outcome['results'][owner] = None
+        finally:
+            if body_response is not None and body_response is not response:
+                release(body_response)
+        return outcome
@@ -1,10 +1,15 @@
 import socket
-from urllib.parse import urlparse
-import threading
+import selectors
+import errno
 import time
+from urllib.parse import urlparse
+from scanner.resolver import get_resolver
+
+# connect_ex results meaning "handshake still in progress" on a non-blocking socket
+CONNECT_PENDING = {errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY, 10035}
 
 class PortScanner:
-    def __init__(self):
+    def __init__(self, ports=None, max_in_flight=256, timeout=2, resolver=None):
         self.common_ports = [
             21,    # FTP
             22,    # SSH
@@ -27,8 +32,12 @@ class PortScanner:
             8443,  # HTTPS Alt
             27017  # MongoDB
         ]
-        self.open_ports = []
-        self.lock = threading.Lock()
+        # Ports to scan: a list, a range or a spec such as "1-1024,3306";
+        # defaults to common_ports
+        self.ports = ports
+        self.max_in_flight = max_in_flight  # Sockets connecting at once
+        self.timeout = timeout
+        self.resolver = resolver  # Defaults to the process-wide DNS cache
     
     def check(self, url):
         """Perform port scan on target host"""
@@ -47,9 +56,9 @@ class PortScanner:
                     'recommendation': 'Provide a valid URL'
                 }]
             
-            # Resolve hostname to IP
+            # Resolve hostname to one IPv4 and one IPv6 address (if any)
             try:
-                ip_address = socket.gethostbyname(hostname)
+                ip_addresses = (self.resolver or get_resolver()).resolve_by_family(hostname)
             except socket.gaierror:
                 return [{
                     'type': 'Port Scan Error',
@@ -58,21 +67,11 @@ class PortScanner:
                     'recommendation': 'Check if the hostname is correct'
                 }]
             
-            self.open_ports = []
-            threads = []
-            
-            # Create threads for port scanning
-            for port in self.common_ports:
-                thread = threading.Thread(target=self._scan_port, args=(ip_address, port))
-                threads.append(thread)
-                thread.start()
-            
-            # Wait for all threads to complete
-            for thread in threads:
-                thread.join()
+            open_ports = self._connect_scan(ip_addresses, self._get_ports())
             
             # Analyze results
-            vulnerabilities.extend(self._analyze_open_ports(hostname, ip_address))
+            for ip_address in ip_addresses:
+                vulnerabilities.extend(self._analyze_open_ports(hostname, ip_address, open_ports[ip_address]))
         
         except Exception as e:
             vulnerabilities.append({
@@ -84,30 +83,107 @@ class PortScanner:
         
         return vulnerabilities
     
-    def _scan_port(self, ip_address, port):
-        """Scan a single port"""
+    def _get_ports(self):
+        """Return the ports to scan as an iterable of ints"""
+        if self.ports is None:
+            return self.common_ports
+        if not isinstance(self.ports, str):
+            return self.ports
+        
+        ports = []
+        for part in self.ports.split(','):
+            part = part.strip()
+            if '-' in part:
+                first, last = part.split('-', 1)
+                ports.append(range(int(first), int(last) + 1))
+            elif part:
+                ports.append([int(part)])
+        return (port for group in ports for port in group)
+    
+    def _connect_scan(self, ip_addresses, ports):
+        """TCP connect scan of every ip/port pair using non-blocking sockets
+        
+        At most max_in_flight connections are pending at once, so large
+        port ranges across several addresses run in a single thread.
+        """
+        ports = list(ports)
+        targets = ((ip_address, port) for ip_address in ip_addresses for port in ports)
+        open_ports = {ip_address: [] for ip_address in ip_addresses}
+        selector = selectors.DefaultSelector()
+        pending = {}  # socket -> (ip_address, port, deadline), oldest first
+        
+        try:
+            while True:
+                # Keep the in-flight window full
+                while len(pending) < self.max_in_flight:
+                    target = next(targets, None)
+                    if target is None:
+                        break
+                    self._start_connect(selector, pending, open_ports, *target)
+                
+                if not pending:
+                    break
+                
+                # Connections start in order with one timeout, so the
+                # oldest pending socket always has the nearest deadline
+                oldest_deadline = next(iter(pending.values()))[2]
+                wait = max(0, oldest_deadline - time.monotonic())
+                for key, _ in selector.select(timeout=wait):
+                    sock = key.fileobj
+                    ip_address, port, _ = pending.pop(sock)
+                    if sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) == 0:
+                        open_ports[ip_address].append(port)
+                    selector.unregister(sock)
+                    sock.close()
+                
+                # Give up on connections that outlived the timeout
+                now = time.monotonic()
+                for sock, (_, _, deadline) in list(pending.items()):
+                    if deadline > now:
+                        break
+                    del pending[sock]
+                    selector.unregister(sock)
+                    sock.close()
+        finally:
+            for sock in pending:
+                sock.close()
+            selector.close()
+        
+        return open_ports
+    
+    def _start_connect(self, selector, pending, open_ports, ip_address, port):
+        """Begin a non-blocking connect and register it with the selector"""
+        family = socket.AF_INET6 if ':' in ip_address else socket.AF_INET
+        try:
+            sock = socket.socket(family, socket.SOCK_STREAM)
+        except OSError:
+            return
+        
         try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(2)
+            sock.setblocking(False)
             result = sock.connect_ex((ip_address, port))
-            
-            if result == 0:
-                with self.lock:
-                    self.open_ports.append(port)
-            
+        except OSError:
+            sock.close()
+            return
+        
+        if result == 0:
+            open_ports[ip_address].append(port)
             sock.close()
-        except:
-            pass
+        elif result in CONNECT_PENDING:
+            selector.register(sock, selectors.EVENT_WRITE)
+            pending[sock] = (ip_address, port, time.monotonic() + self.timeout)
+        else:
+            sock.close()  # Refused or unreachable
     
-    def _analyze_open_ports(self, hostname, ip_address):
+    def _analyze_open_ports(self, hostname, ip_address, open_ports):
         """Analyze open ports and create vulnerability reports"""
         vulnerabilities = []
         
-        if not self.open_ports:
+        if not open_ports:
             return vulnerabilities
         
         # Sort ports for consistent reporting
-        self.open_ports.sort()
+        open_ports = sorted(open_ports)
         
         # Port risk analysis
         high_risk_ports = [21, 23, 1433, 3306, 3389, 5432, 5900, 6379, 27017]
@@ -117,13 +193,13 @@ class PortScanner:
         vulnerabilities.append({
             'type': 'Open Ports Discovery',
             'severity': 'info',
-            'description': f'Found {len(self.open_ports)} open ports on {hostname} ({ip_address})',
-            'details': f'Open ports: {", ".join(map(str, self.open_ports))}',
+            'description': f'Found {len(open_ports)} open ports on {hostname} ({ip_address})',
+            'details': f'Open ports: {", ".join(map(str, open_ports))}',
             'recommendation': 'Review if all open ports are necessary and properly secured'
         })
         
         # Specific port analysis
-        for port in self.open_ports:
+        for port in open_ports:
             port_info = self._get_port_info(port)
             
             if port in high_risk_ports:
@@ -0,0 +1,146 @@
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+# Statuses by which a server asks clients to slow down
+THROTTLE_STATUSES = (429, 503)
+
+class HostRate:
+    """Token bucket and AIMD state of one host"""
+
+    __slots__ = ('rate', 'tokens', 'updated', 'blocked_until', 'latency', 'last_decrease', 'slow_start')
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0  # Honours Retry-After
+        self.latency = None  # Moving average of healthy response times
+        self.last_decrease = 0.0
+        self.slow_start = True  # Until the first sign of overload
+
+class RateLimiter:
+    """Per-host token buckets whose rates adapt to how each host copes
+
+    Every request takes a token from its host's bucket and from a global
+    bucket shared by all concurrent scans, waiting if either is empty.
+    Host rates follow AIMD with a slow start: until a host first shows
+    strain, each healthy response adds one request/s (doubling the rate
+    every second); after that, healthy responses add `increase` requests/s
+    per second's worth of requests. A 429/503, a timeout or connection
+    failure, or a response slow_factor times (and min_slowdown seconds)
+    slower than the host's usual latency multiplies the rate by `decrease`,
+    at most once per observed round trip so one burst of errors counts
+    once. Retry-After pauses the host entirely, up to max_retry_after
+    seconds. Responses observed with expect_slow (e.g. time-based
+    injection probes) are slow on purpose and give no latency feedback.
+    """
+
+    def __init__(self, initial_rate=20, min_rate=0.5, max_rate=100, burst=10, global_rate=300,
+                 increase=2.0, decrease=0.5, slow_factor=4, min_slowdown=0.5, max_retry_after=60,
+                 max_hosts=1024):
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.global_rate = global_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_factor = slow_factor  # Latency multiple that counts as overload
+        self.min_slowdown = min_slowdown  # ...provided it is also this many seconds slower
+        self.max_retry_after = max_retry_after
+        self.max_hosts = max_hosts
+        self._hosts = OrderedDict()
+        self._global = HostRate(global_rate, global_rate)
+        self._lock = threading.Lock()
+
+    def acquire(self, url):
+        """Wait until url's host and the global budget allow one more request"""
+        host = self._host(url)
+        while True:
+            with self._lock:
+                state = self._state(host)
+                now = time.monotonic()
+                self._refill(state, now, self.burst)
+                self._refill(self._global, now, self.global_rate)
+                wait = max(state.blocked_until - now,
+                           (1 - state.tokens) / state.rate if state.tokens < 1 else 0,
+                           (1 - self._global.tokens) / self._global.rate if self._global.tokens < 1 else 0)
+                if wait <= 0:
+                    state.tokens -= 1
+                    self._global.tokens -= 1
+                    return
+            time.sleep(min(wait, 1.0))
+
+    def observe(self, url, status=None, elapsed=None, retry_after=None, failed=False, expect_slow=False):
+        """Adapt url's host rate to one response (or failure)"""
+        if expect_slow:
+            elapsed = None
+        host = self._host(url)
+        with self._lock:
+            state = self._state(host)
+            now = time.monotonic()
+
+            delay = self._retry_after(retry_after) if status in THROTTLE_STATUSES else None
+            if delay:
+                state.blocked_until = max(state.blocked_until, now + min(delay, self.max_retry_after))
+
+            overloaded = failed or status in THROTTLE_STATUSES
+            if not overloaded and elapsed is not None:
+                if state.latency is not None and elapsed > max(self.slow_factor * state.latency,
+                                                               state.latency + self.min_slowdown):
+                    overloaded = True
+                else:
+                    state.latency = elapsed if state.latency is None else 0.8 * state.latency + 0.2 * elapsed
+
+            if overloaded:
+                if now - state.last_decrease >= (state.latency or 1.0):
+                    state.rate = max(self.min_rate, state.rate * self.decrease)
+                    state.tokens = min(state.tokens, 1)
+                    state.last_decrease = now
+                    state.slow_start = False
+            elif state.slow_start:
+                state.rate = min(self.max_rate, state.rate + 1)
+            else:
+                state.rate = min(self.max_rate, state.rate + self.increase / state.rate)
+
+    def honours(self, retry_after):
+        """Whether a Retry-After value is short enough to wait for"""
+        delay = self._retry_after(retry_after)
+        return delay is not None and delay <= self.max_retry_after
+
+    def rate(self, url):
+        """Current request rate allowed for url's host"""
+        with self._lock:
+            return self._state(self._host(url)).rate
+
+    def _state(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = HostRate(self.initial_rate, self.burst)
+            while len(self._hosts) > self.max_hosts:
+                self._hosts.popitem(last=False)
+        else:
+            self._hosts.move_to_end(host)
+        return state
+
+    def _refill(self, state, now, capacity):
+        state.tokens = min(capacity, state.tokens + (now - state.updated) * state.rate)
+        state.updated = now
+
+    def _retry_after(self, value):
+        """Seconds to wait from a Retry-After header (delta seconds or HTTP date), or None"""
+        if not value:
+            return None
+        value = value.strip()
+        if value.isdigit():
+            return int(value)
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def _host(self, url):
+        return (urlparse(url).hostname or '').lower()
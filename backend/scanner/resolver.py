@@ -0,0 +1,125 @@
+import socket
+import ipaddress
+import threading
+import time
+from collections import OrderedDict
+
+def system_lookup(hostname):
+    """Resolve hostname with getaddrinfo, returning (addresses, ttl)
+
+    getaddrinfo does not expose record TTLs, so ttl is None and the
+    cache's default applies.
+    """
+    addresses = []
+    for family, _, _, _, sockaddr in socket.getaddrinfo(hostname, None, proto=socket.IPPROTO_TCP):
+        if family in (socket.AF_INET, socket.AF_INET6) and sockaddr[0] not in addresses:
+            addresses.append(sockaddr[0])
+    return addresses, None
+
+class StubLookup:
+    """Fixed hostname -> addresses table, for tests and local overrides"""
+
+    def __init__(self, records, ttl=None):
+        self.records = records
+        self.ttl = ttl
+        self.queries = 0
+
+    def __call__(self, hostname):
+        self.queries += 1
+        addresses = self.records.get(hostname)
+        if not addresses:
+            raise socket.gaierror(socket.EAI_NONAME, f'Name or service not known: {hostname}')
+        return list(addresses), self.ttl
+
+class DNSCache:
+    """Process-wide resolver cache with TTLs and negative caching
+
+    At most max_entries hostnames are kept; the least recently resolved
+    are forgotten first.
+    """
+
+    def __init__(self, lookup=system_lookup, default_ttl=300, negative_ttl=30, max_ttl=3600,
+                 max_entries=4096):
+        self.lookup = lookup
+        self.default_ttl = default_ttl
+        self.negative_ttl = negative_ttl
+        self.max_ttl = max_ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # hostname -> (expires, addresses or gaierror)
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, hostname):
+        """Return every A/AAAA address for hostname, raising socket.gaierror if it does not resolve"""
+        if self._is_ip(hostname):
+            return [hostname]
+
+        hostname = hostname.lower().rstrip('.')
+        with self._lock:
+            host_lock = self._locks.setdefault(hostname, threading.Lock())
+
+        # Only one thread looks a given name up; the rest wait for its answer
+        with host_lock:
+            with self._lock:
+                entry = self._entries.get(hostname)
+            if entry is None or entry[0] <= time.monotonic():
+                entry = self._lookup(hostname)
+            with self._lock:
+                self._store(hostname, entry)
+
+        if isinstance(entry[1], Exception):
+            raise socket.gaierror(*entry[1].args)
+        return list(entry[1])
+
+    def resolve_by_family(self, hostname):
+        """Return the first IPv4 and the first IPv6 address of hostname, when present"""
+        addresses = []
+        seen_families = set()
+        for address in self.resolve(hostname):
+            family = ipaddress.ip_address(address).version
+            if family not in seen_families:
+                seen_families.add(family)
+                addresses.append(address)
+        return addresses
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _store(self, hostname, entry):
+        self._entries[hostname] = entry
+        self._entries.move_to_end(hostname)
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._locks.pop(evicted, None)
+
+    def _lookup(self, hostname):
+        try:
+            addresses, ttl = self.lookup(hostname)
+        except socket.gaierror as e:
+            return (time.monotonic() + self.negative_ttl, e)
+
+        if not addresses:
+            error = socket.gaierror(socket.EAI_NONAME, f'No addresses for {hostname}')
+            return (time.monotonic() + self.negative_ttl, error)
+
+        ttl = self.default_ttl if ttl is None else min(ttl, self.max_ttl)
+        return (time.monotonic() + ttl, addresses)
+
+    def _is_ip(self, hostname):
+        try:
+            ipaddress.ip_address(hostname)
+            return True
+        except ValueError:
+            return False
+
+_resolver = DNSCache()
+
+def get_resolver():
+    """Return the process-wide resolver cache"""
+    return _resolver
+
+def set_resolver(resolver):
+    """Replace the process-wide resolver, e.g. with DNSCache(StubLookup(...)) in tests"""
+    global _resolver
+    _resolver = resolver
@@ -0,0 +1,80 @@
+import threading
+from concurrent.futures import Future
+
+class ResponseCache:
+    """Per-scan cache so every distinct resource is fetched only once"""
+
+    # Request headers that change what the server sends back
+    relevant_headers = ('user-agent', 'accept', 'accept-language', 'accept-encoding',
+                        'cookie', 'authorization', 'range')
+    cacheable_methods = ('GET', 'HEAD')
+
+    def __init__(self, incremental=None):
+        self.incremental = incremental  # Optional IncrementalState for rescans
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, session, url, **kwargs):
+        """Cached equivalent of session.get(url, **kwargs)"""
+        return self.request(session, 'GET', url, **kwargs)
+
+    def request(self, session, method, url, **kwargs):
+        """Send a request through session unless an identical one was already made"""
+        method = method.upper()
+
+        # Streamed bodies can only be consumed once, so they are never shared
+        if method not in self.cacheable_methods or kwargs.get('stream'):
+            return session.request(method, url, **kwargs)
+
+        key = self._make_key(session, method, url, kwargs)
+        return self.memoize(key, lambda: session.request(method, url, **kwargs))
+
+    def analyze(self, namespace, url, response, analyze):
+        """Run analyze(response), reusing the previous scan's result for unchanged content"""
+        if self.incremental is None:
+            return analyze(response)
+        return self.incremental.analyze(namespace, url, response, analyze)
+
+    def memoize(self, key, factory):
+        """Return the value for key, calling factory at most once per scan"""
+        with self._lock:
+            future = self._entries.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._entries[key] = future
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        # Concurrent callers for the same key wait on the first one's result;
+        # failures are shared too so a dead host is not retried by every checker
+        if owner:
+            try:
+                future.set_result(factory())
+            except Exception as e:
+                future.set_exception(e)
+
+        return future.result()
+
+    def _make_key(self, session, method, url, kwargs):
+        """Build the cache key from method, URL and the request options that matter"""
+        headers = {k.lower(): v for k, v in getattr(session, 'headers', {}).items()}
+        headers.update({k.lower(): v for k, v in (kwargs.get('headers') or {}).items()})
+
+        params = kwargs.get('params')
+        if isinstance(params, dict):
+            params = tuple(sorted((k, str(v)) for k, v in params.items()))
+        elif isinstance(params, list):
+            params = tuple(tuple(item) for item in params)
+
+        return (
+            method,
+            url,
+            params,
+            kwargs.get('allow_redirects', method != 'HEAD'),
+            kwargs.get('verify', True),
+            tuple(sorted((k, v) for k, v in headers.items() if k in self.relevant_headers))
+        )
@@ -1,10 +1,17 @@
-import requests
 import re
-from urllib.parse import urljoin, urlparse
-import time
+from scanner.response_cache import ResponseCache
+from scanner.transport import get_transport
+from scanner.path_probe import PathProbe
+from scanner.matcher import PatternSet
+from scanner.streaming import BodyReader
 
 class SensitiveInfoScanner:
-    def __init__(self):
+    def __init__(self, max_file_bytes=1024 * 1024, chunk_size=64 * 1024, max_evidence=10):
+        # Exposed files are streamed: at most max_file_bytes of each is read,
+        # and reading stops once max_evidence pattern matches are found
+        self.max_file_bytes = max_file_bytes
+        self.chunk_size = chunk_size
+        self.max_evidence = max_evidence
         self.sensitive_files = [
             'robots.txt',
             'sitemap.xml',
@@ -38,22 +45,40 @@ class SensitiveInfoScanner:
             'secret_key': r'(?i)(secret_key|secret)[\s=:]+["\']?[a-zA-Z0-9]{20,}["\']?'
         }
         
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        # All patterns are matched in one pass over each page
+        self.pattern_matcher = PatternSet(self.sensitive_patterns)
+        
+        # Per-file items counted while a file body streams past
+        self.file_counters = {
+            'robots.txt': re.compile(r'Disallow:\s*(.+)', re.IGNORECASE),
+            '.env': re.compile(r'^[A-Z_]+=', re.MULTILINE)
+        }
+        self.file_markers = {
+            'phpinfo.php': 'PHP Version',
+            'info.php': 'PHP Version'
+        }
+        self.session = get_transport()
+    
+    def register_probes(self, probe):
+        """Register the sensitive file paths with a shared path probe"""
+        probe.register(self.sensitive_files, owner='sensitive_files', handler=self._analyze_file_response,
+                       max_bytes=self.max_file_bytes)
     
-    def check(self, url):
+    def check(self, url, cache=None, probe=None):
         """Scan for sensitive information exposure"""
         vulnerabilities = []
+        cache = cache or ResponseCache()
+        if probe is None:
+            probe = PathProbe(self.session)
+            self.register_probes(probe)
         
         try:
             # Check main page first
-            main_page_vulns = self._scan_page_content(url)
+            main_page_vulns = self._scan_page_content(url, cache)
             vulnerabilities.extend(main_page_vulns)
             
             # Check for sensitive files
-            file_vulns = self._scan_sensitive_files(url)
+            file_vulns = self._scan_sensitive_files(url, probe)
             vulnerabilities.extend(file_vulns)
             
         except Exception as e:
@@ -66,17 +91,25 @@ class SensitiveInfoScanner:
         
         return vulnerabilities
     
-    def _scan_page_content(self, url):
+    def _scan_page_content(self, url, cache):
         """Scan page content for sensitive information"""
+        try:
+            response = cache.get(self.session, url, timeout=10)
+            return cache.analyze('sensitive-page', url, response, self._find_sensitive_patterns)
+        except Exception:
+            return []
+    
+    def _find_sensitive_patterns(self, response):
+        """Look for sensitive data patterns in a page body"""
         vulnerabilities = []
         
         try:
-            response = self.session.get(url, timeout=10)
             content = response.text
             
             # Check for sensitive patterns
-            for pattern_name, pattern in self.sensitive_patterns.items():
-                matches = re.findall(pattern, content)
+            found = self.pattern_matcher.findall(content)
+            for pattern_name in self.sensitive_patterns:
+                matches = found.get(pattern_name)
                 
                 if matches:
                     # Filter out common false positives
@@ -97,40 +130,52 @@ class SensitiveInfoScanner:
         
         return vulnerabilities
     
-    def _scan_sensitive_files(self, url):
+    def _scan_sensitive_files(self, url, probe):
         """Scan for sensitive files"""
         vulnerabilities = []
         
+        # Paths are fetched by the shared probe, which hands each response
+        # to _analyze_file_response
+        outcomes = probe.run(url)
         for filename in self.sensitive_files:
-            try:
-                file_url = urljoin(url.rstrip('/') + '/', filename)
-                response = self.session.get(file_url, timeout=5)
-                
-                if response.status_code == 200 and len(response.text) > 0:
-                    severity = self._get_file_severity(filename)
-                    
-                    vulnerability = {
-                        'type': f'Sensitive File Exposure - {filename}',
-                        'severity': severity,
-                        'description': f'Sensitive file "{filename}" is publicly accessible',
-                        'details': f'File found at: {file_url}',
-                        'recommendation': self._get_file_recommendation(filename)
-                    }
-                    
-                    # Check file content for additional sensitive info
-                    content_analysis = self._analyze_file_content(filename, response.text)
-                    if content_analysis:
-                        vulnerability['details'] += f' | {content_analysis}'
-                    
-                    vulnerabilities.append(vulnerability)
-                
-                time.sleep(0.1)  # Rate limiting
-            
-            except Exception:
-                continue
+            outcome = outcomes.get(filename)
+            vulnerability = outcome['results'].get('sensitive_files') if outcome else None
+            if vulnerability:
+                vulnerabilities.append(vulnerability)
         
         return vulnerabilities
     
+    def _analyze_file_response(self, filename, file_url, response):
+        """Create a finding for a probed sensitive file, if it is exposed
+        
+        The probe streams the body, so it is analysed chunk by chunk and
+        never held in memory as a whole.
+        """
+        if response.status_code not in (200, 206):  # 206: the probe asked for a byte range
+            return None
+        
+        body = BodyReader(response, self.max_file_bytes, self.chunk_size)
+        evidence = self._scan_file_body(filename, body)
+        if body.bytes_read == 0:
+            return None
+        
+        severity = self._get_file_severity(filename)
+        
+        vulnerability = {
+            'type': f'Sensitive File Exposure - {filename}',
+            'severity': severity,
+            'description': f'Sensitive file "{filename}" is publicly accessible',
+            'details': f'File found at: {file_url}',
+            'recommendation': self._get_file_recommendation(filename)
+        }
+        
+        # Check file content for additional sensitive info
+        content_analysis = self._analyze_file_content(filename, evidence, body.truncated)
+        if content_analysis:
+            vulnerability['details'] += f' | {content_analysis}'
+        
+        return vulnerability
+    
     def _filter_matches(self, pattern_name, matches):
         """Filter out common false positives"""
         filtered = []
@@ -189,20 +234,54 @@ class SensitiveInfoScanner:
         
         return recommendations.get(filename, f'Secure or remove {filename} from public access')
     
-    def _analyze_file_content(self, filename, content):
-        """Analyze file content for additional sensitive information"""
+    def _scan_file_body(self, filename, body):
+        """Count file-specific items and sensitive patterns in a streamed body
+        
+        Stops reading early once the file-specific check is settled and
+        max_evidence pattern matches have been collected.
+        """
+        evidence = {'count': 0, 'marker': False, 'patterns': {}}
+        counter = self.file_counters.get(filename)
+        marker = self.file_markers.get(filename)
+        matches = 0
+        
+        for window, fresh, limit in body.windows():
+            # Only matches ending in (fresh, limit] belong to this window
+            if counter:
+                evidence['count'] += sum(1 for match in counter.finditer(window) if fresh < match.end() <= limit)
+            if marker and marker in window:
+                evidence['marker'] = True
+            
+            for pattern_name, value, end in self.pattern_matcher.iter_matches(window):
+                if fresh < end <= limit and self._filter_matches(pattern_name, [value]):
+                    evidence['patterns'][pattern_name] = evidence['patterns'].get(pattern_name, 0) + 1
+                    matches += 1
+            
+            settled = counter is None and (marker is None or evidence['marker'])
+            if settled and matches >= self.max_evidence:
+                break
+        
+        return evidence
+    
+    def _analyze_file_content(self, filename, evidence, truncated=False):
+        """Describe the sensitive information found in a file's content"""
+        findings = []
+        at_least = 'at least ' if truncated else ''
+        
         if filename == 'robots.txt':
-            disallowed = re.findall(r'Disallow:\s*(.+)', content, re.IGNORECASE)
-            if disallowed:
-                return f'Reveals {len(disallowed)} hidden directories'
+            if evidence['count']:
+                findings.append(f'Reveals {at_least}{evidence["count"]} hidden directories')
         
         elif filename in ['phpinfo.php', 'info.php']:
-            if 'PHP Version' in content:
-                return 'Exposes PHP configuration and server details'
+            if evidence['marker']:
+                findings.append('Exposes PHP configuration and server details')
         
         elif filename == '.env':
-            env_vars = len(re.findall(r'^[A-Z_]+=', content, re.MULTILINE))
-            if env_vars > 0:
-                return f'Contains {env_vars} environment variables'
+            if evidence['count']:
+                findings.append(f'Contains {at_least}{evidence["count"]} environment variables')
+        
+        if evidence['patterns']:
+            counts = ', '.join(f'{count} {pattern_name}' for pattern_name, count in evidence['patterns'].items())
+            findings.append(f'Matches sensitive data patterns ({counts})')
         
-        return None
\ No newline at end of file
+        return ' | '.join(findings) or None
\ No newline at end of file
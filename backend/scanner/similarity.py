@@ -0,0 +1,111 @@
+import hashlib
+import html
+import re
+from urllib.parse import quote, quote_plus
+
+# Values that change between requests for the same page: UUIDs, long
+# tokens (CSRF, session, cache busters) and numbers (counters, dates, times)
+_DYNAMIC = re.compile(
+    r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}'
+    r'|[A-Za-z0-9+_\-]{24,}={0,2}'
+    r'|\d+',
+    re.IGNORECASE
+)
+_WORD = re.compile(r'\w+|[<>/="\']')
+
+SIMHASH_BITS = 64
+_LANE = 24  # Bits per counter lane when summing packed hashes (up to 16M shingles)
+_MASK = (1 << SIMHASH_BITS) - 1
+
+# _SPREAD[byte][value] moves bit i of value (the byte'th byte of a hash) to
+# its own lane, so the per-bit counts of many hashes are one big-int sum
+_SPREAD = [[sum(1 << ((byte * 8 + bit) * _LANE) for bit in range(8) if value >> bit & 1)
+            for value in range(256)]
+           for byte in range(SIMHASH_BITS // 8)]
+
+def normalize(text, removed=()):
+    """Text with dynamic tokens and the given strings (e.g. a reflected payload) removed"""
+    for value in removed:
+        if value:
+            for variant in {value, html.escape(value), html.escape(value, quote=False),
+                            quote(value), quote_plus(value)}:
+                text = text.replace(variant, '')
+    return _DYNAMIC.sub('', text)
+
+def simhash(text, shingle=3):
+    """64-bit simhash of the word shingles of text
+
+    Near-identical texts get hashes a few bits apart; unrelated ones
+    differ in about half the bits. Shingles are hashed with hash(), so
+    fingerprints are only comparable within one process.
+    """
+    words = _WORD.findall(text)
+    if len(words) < shingle:
+        features = {tuple(words)}
+    else:
+        features = set(zip(*(words[i:] for i in range(shingle))))
+
+    total = 0
+    for feature in features:
+        value = hash(feature) & _MASK
+        for byte in range(SIMHASH_BITS // 8):
+            total += _SPREAD[byte][value >> (byte * 8) & 0xFF]
+
+    lane_mask = (1 << _LANE) - 1
+    half = len(features) / 2
+    result = 0
+    for bit in range(SIMHASH_BITS):
+        if (total >> (bit * _LANE)) & lane_mask > half:
+            result |= 1 << bit
+    return result
+
+class ResponseFingerprint:
+    """Constant-size summary of a response body, computed once
+
+    `digest` identifies the normalised body exactly and `simhash` locates
+    it approximately, so comparing two responses is an equality test and
+    a popcount, whatever their size.
+    """
+
+    __slots__ = ('status', 'length', 'digest', 'simhash')
+
+    def __init__(self, text, status=None, removed=()):
+        text = normalize(text, removed)
+        self.status = status
+        self.length = len(text)
+        self.digest = hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        self.simhash = simhash(text)
+
+    @classmethod
+    def of(cls, response, removed=()):
+        return cls(response.text, response.status_code, removed)
+
+    def distance(self, other):
+        """Differing simhash bits; 0 only for identical normalised bodies"""
+        if self.digest == other.digest:
+            return 0
+        return bin(self.simhash ^ other.simhash).count('1') or 1  # int.bit_count() needs Python 3.10
+
+class SimilarityModel:
+    """Decides whether responses match a page, given two samples of it
+
+    Two fetches of the same page measure how much it changes by itself.
+    A page that normalises identically both times is stable, and any
+    other body (or status) differs from it; a dynamic page tolerates the
+    observed noise plus `slack` bits and needs `margin` more to differ.
+    """
+
+    def __init__(self, baseline, repeat, slack=3, margin=6):
+        self.baseline = baseline
+        self.stable = baseline.digest == repeat.digest
+        self.tolerance = 0 if self.stable else baseline.distance(repeat) + slack
+        self.margin = margin
+
+    def matches(self, fingerprint):
+        return fingerprint.status == self.baseline.status and self.baseline.distance(fingerprint) <= self.tolerance
+
+    def differs(self, fingerprint):
+        if fingerprint.status != self.baseline.status:
+            return True
+        distance = self.baseline.distance(fingerprint)
+        return distance > 0 if self.stable else distance > self.tolerance + self.margin
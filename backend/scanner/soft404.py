@@ -0,0 +1,87 @@
+import hashlib
+import math
+import posixpath
+import secrets
+import threading
+from scanner.similarity import normalize
+from scanner.streaming import BodyReader, release
+
+def length_bucket(length):
+    """Logarithmic size class of a body length: lengths within about 10% share a bucket"""
+    return int(math.log(length + 1, 1.1))
+
+class Soft404Detector:
+    """Recognises "not found" pages served with a success or redirect status
+
+    For each directory level and file extension, `samples` random paths
+    that cannot exist are fetched once and reduced to signatures: status,
+    length bucket and hash of the body (and Location) with dynamic tokens
+    and the requested name stripped, so pages echoing the path still
+    match. A candidate fetched with request() is reduced the same way by
+    fingerprint() and discarded with a set lookup. Signatures are computed
+    on first use, so sites that answer random paths with 404 only cost the
+    samples.
+
+    signatures() issues requests: call it before taking a connection
+    from the pool, never while holding a streamed response.
+    """
+
+    def __init__(self, session, timeout=5, samples=2, max_bytes=64 * 1024):
+        self.session = session
+        self.timeout = timeout
+        self.samples = samples
+        self.max_bytes = max_bytes
+        self._levels = {}  # (base url, level, extension) -> frozenset of signatures
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def signatures(self, base_url, path):
+        """Signatures of random missing paths at path's level and extension, computed once"""
+        level = posixpath.dirname(path.rstrip('/'))
+        extension = posixpath.splitext(path.rstrip('/'))[1].lower()
+        key = (base_url, level, extension)
+        with self._lock:
+            signatures = self._levels.get(key)
+            if signatures is not None:
+                return signatures
+            key_lock = self._locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                signatures = self._levels.get(key)
+            if signatures is None:
+                found = set()
+                for _ in range(self.samples):
+                    name = secrets.token_hex(8) + extension
+                    try:
+                        response = self.request(base_url + posixpath.join(level, name))
+                    except Exception:
+                        continue
+                    try:
+                        found.add(self.fingerprint(response, name))
+                    except Exception:
+                        pass
+                    finally:
+                        release(response)
+                signatures = frozenset(found)
+                with self._lock:
+                    self._levels[key] = signatures
+        return signatures
+
+    def request(self, url, headers=None):
+        """GET the first max_bytes of url, streamed, as fingerprint() expects it"""
+        return self.session.get(url, timeout=self.timeout, allow_redirects=False, stream=True,
+                                headers=dict(headers or {}, Range=f'bytes=0-{self.max_bytes - 1}'))
+
+    def fingerprint(self, response, name):
+        """(status, length bucket, content digest) of a response from request(), reading its body"""
+        body = BodyReader(response, self.max_bytes)
+        text = normalize(response.headers.get('Location', '') + '\n' + ''.join(body.texts()),
+                         removed=(name,))
+        digest = hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        return self.status(response), length_bucket(len(text)), digest
+
+    def status(self, response):
+        """Status of a response from request(), as if the whole body had been asked for"""
+        # A 206 for a range is the same answer as a 200 for the whole body
+        return 200 if response.status_code in (206, 416) else response.status_code
@@ -1,63 +1,81 @@
-import requests
-from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
-import re
-import time
+from urllib.parse import urlparse
+from scanner.response_cache import ResponseCache
+from scanner.transport import get_transport
+from scanner.matcher import PatternSet
+from scanner.crawler import get_attack_surface
+from scanner.timing import TimingEngine
+from scanner.budget import ScanBudget, BudgetedSession, BudgetScheduler, BudgetExhausted
+from scanner.similarity import ResponseFingerprint, SimilarityModel
 
 class SQLInjectionChecker:
-    def __init__(self):
+    def __init__(self, max_requests=600, time_budget=90, concurrency=8):
         self.timeout = 10
+        # Per-scan allowance: tests run in parallel until either runs out
+        self.max_requests = max_requests
+        self.time_budget = time_budget  # Seconds, within the check's deadline
+        self.concurrency = concurrency
+        self.session = get_transport()
         self.payloads = [
             "'", '"', "1'", "1\"", "1' OR '1'='1", "1\" OR \"1\"=\"1",
             "' OR 1=1--", "\" OR 1=1--", "'; DROP TABLE users--",
             "1' UNION SELECT NULL--", "1' AND 1=1--", "1' AND 1=2--",
-            "1' OR SLEEP(5)--", "1'; WAITFOR DELAY '00:00:05'--",
-            "1' OR pg_sleep(5)--", "admin'--", "admin\"--"
+            "admin'--", "admin\"--"
+        ]
+        # Delay payloads, run by the timing engine with {delay} seconds
+        self.time_payloads = [
+            "1' OR SLEEP({delay})--", "1'; WAITFOR DELAY '00:00:{delay:02d}'--",
+            "1' OR pg_sleep({delay})--"
+        ]
+        self.timing = TimingEngine()
+        # (true condition, false condition) suffixes for the original value
+        self.boolean_payloads = [
+            ("' AND '1'='1", "' AND '1'='2"), (" AND 1=1", " AND 1=2"),
+            ("' AND 1=1-- ", "' AND 1=2-- "), ('" AND "1"="1', '" AND "1"="2')
         ]
         
+        # (database, error signature) pairs
         self.error_patterns = [
-            r"sql syntax.*mysql",
-            r"warning.*mysql_.*",
-            r"valid mysql result",
-            r"mysqlclient\.",
-            r"postgresql.*error",
-            r"warning.*pg_.*",
-            r"valid postgresql result",
-            r"npgsql\.",
-            r"driver.* sql server",
-            r"ole db.* sql server",
-            r"(\[sql server\]|\[odbc sql server driver\])",
-            r"microsoft access.*driver",
-            r"microsoft jet database engine",
-            r"oracle error",
-            r"oracle.*driver",
-            r"warning.*oci_.*",
-            r"warning.*ora_.*",
-            r"sqlite.*error",
-            r"warning.*sqlite_.*",
-            r"pdo_sqlite",
-            r"sql error.*pdo\.",
-            r"warning.*pdo_.*"
+            ('MySQL', r"sql syntax.*mysql"),
+            ('MySQL', r"warning.*mysql_.*"),
+            ('MySQL', r"valid mysql result"),
+            ('MySQL', r"mysqlclient\."),
+            ('PostgreSQL', r"postgresql.*error"),
+            ('PostgreSQL', r"warning.*pg_.*"),
+            ('PostgreSQL', r"valid postgresql result"),
+            ('PostgreSQL', r"npgsql\."),
+            ('Microsoft SQL Server', r"driver.* sql server"),
+            ('Microsoft SQL Server', r"ole db.* sql server"),
+            ('Microsoft SQL Server', r"(\[sql server\]|\[odbc sql server driver\])"),
+            ('Microsoft Access', r"microsoft access.*driver"),
+            ('Microsoft Access', r"microsoft jet database engine"),
+            ('Oracle', r"oracle error"),
+            ('Oracle', r"oracle.*driver"),
+            ('Oracle', r"warning.*oci_.*"),
+            ('Oracle', r"warning.*ora_.*"),
+            ('SQLite', r"sqlite.*error"),
+            ('SQLite', r"warning.*sqlite_.*"),
+            ('SQLite', r"pdo_sqlite"),
+            ('PDO', r"sql error.*pdo\."),
+            ('PDO', r"warning.*pdo_.*")
         ]
+        # Compiled once; every response is checked in a single pass over
+        # its lower-cased text
+        self.error_matcher = PatternSet(self.error_patterns, lowercase=True)
     
-    def check(self, url):
+    def check(self, url, cache=None):
         """Test for SQL injection vulnerabilities"""
         vulnerabilities = []
+        cache = cache or ResponseCache()
         
         try:
-            # Parse URL to extract parameters
-            parsed_url = urlparse(url)
-            params = parse_qs(parsed_url.query)
+            # URL parameters and forms of every page crawled from url,
+            # each unique endpoint and parameter tested once
+            surface = get_attack_surface(cache, self.session, url)
+            targets = list(surface.parameters())
             
-            if not params:
-                # Try to find forms with input fields
-                try:
-                    response = requests.get(url, timeout=self.timeout)
-                    forms = self._extract_forms(response.text)
-                    if forms:
-                        vulnerabilities.extend(self._test_forms(url, forms))
-                except:
-                    pass
-                
+            if targets:
+                vulnerabilities.extend(self._test_targets(targets))
+            else:
                 # No parameters found
                 vulnerabilities.append({
                     'type': 'SQL Injection',
@@ -67,13 +85,6 @@ class SQLInjectionChecker:
                     'impact': 'Cannot determine SQL injection vulnerability status',
                     'recommendation': 'Test individual pages with parameters or forms'
                 })
-                return vulnerabilities
-            
-            # Test each parameter
-            for param_name, param_values in params.items():
-                if param_values:
-                    original_value = param_values[0]
-                    vulnerabilities.extend(self._test_parameter(url, param_name, original_value))
         
         except Exception as e:
             vulnerabilities.append({
@@ -87,151 +98,180 @@ class SQLInjectionChecker:
         
         return vulnerabilities
     
-    def _test_parameter(self, url, param_name, original_value):
-        """Test a specific parameter for SQL injection"""
-        vulnerabilities = []
-        parsed_url = urlparse(url)
+    def _test_targets(self, targets):
+        """Test (endpoint, field) pairs in parallel within this check's request and time budget"""
+        budget = ScanBudget(self.max_requests, self.time_budget)
+        session = BudgetedSession(self.session, budget)
+        scheduler = BudgetScheduler(budget, self.concurrency)
+        findings = []  # (target index, finding)
+        confirmed = set()
         
-        try:
-            # Get baseline response
-            baseline_response = requests.get(url, timeout=self.timeout)
-            baseline_time = baseline_response.elapsed.total_seconds()
-            baseline_content = baseline_response.text
-            
-            for payload in self.payloads:
-                try:
-                    # Create modified URL with payload
-                    params = parse_qs(parsed_url.query)
-                    params[param_name] = [payload]
-                    new_query = urlencode(params, doseq=True)
-                    test_url = urlunparse(parsed_url._replace(query=new_query))
-                    
-                    # Send request with payload
-                    start_time = time.time()
-                    response = requests.get(test_url, timeout=self.timeout)
-                    response_time = time.time() - start_time
-                    
-                    # Check for SQL errors in response
-                    if self._check_sql_errors(response.text):
-                        vulnerabilities.append({
-                            'type': 'SQL Injection',
-                            'title': f'SQL Injection in Parameter: {param_name}',
-                            'description': f'SQL error detected when testing parameter "{param_name}" with payload: {payload}',
-                            'severity': 'critical',
-                            'impact': 'Database information could be extracted or modified',
-                            'recommendation': 'Use parameterized queries and input validation'
-                        })
-                        break
-                    
-                    # Check for time-based SQL injection
-                    if 'sleep' in payload.lower() or 'waitfor' in payload.lower():
-                        if response_time > 4:  # Significant delay
-                            vulnerabilities.append({
-                                'type': 'SQL Injection',
-                                'title': f'Time-based SQL Injection in Parameter: {param_name}',
-                                'description': f'Time delay detected when testing parameter "{param_name}" with payload: {payload}',
-                                'severity': 'critical',
-                                'impact': 'Database information could be extracted through time-based attacks',
-                                'recommendation': 'Use parameterized queries and input validation'
-                            })
-                            break
-                    
-                    # Check for boolean-based differences
-                    if len(response.text) != len(baseline_content):
-                        # Simple content length difference check
-                        difference_ratio = abs(len(response.text) - len(baseline_content)) / len(baseline_content)
-                        if difference_ratio > 0.1:  # 10% difference threshold
-                            vulnerabilities.append({
-                                'type': 'SQL Injection',
-                                'title': f'Potential SQL Injection in Parameter: {param_name}',
-                                'description': f'Response content significantly changed with payload: {payload}',
-                                'severity': 'high',
-                                'impact': 'Possible SQL injection vulnerability',
-                                'recommendation': 'Investigate parameter for SQL injection and use parameterized queries'
-                            })
-                
-                except requests.RequestException:
-                    continue
-                except Exception:
-                    continue
+        # Error-based: every parameter gets the first payload before any
+        # gets the second, so a smaller budget narrows depth, not breadth
+        def test_error(unit):
+            index, payload = unit
+            if index in confirmed:
+                return None
+            return self._test_error(session, *targets[index], payload)
         
-        except Exception as e:
+        units = ((index, payload) for payload in self.payloads for index in range(len(targets)))
+        for (index, _), vulnerability in scheduler.run(test_error, units):
+            if vulnerability and index not in confirmed:
+                confirmed.add(index)
+                findings.append((index, vulnerability))
+        
+        # Boolean-based, then time-based, for parameters without an error
+        def test_inference(index):
+            endpoint, field = targets[index]
+            return (self._test_boolean_based(session, endpoint, field)
+                    or self._test_time_based(session, endpoint, field))
+        
+        remaining = [index for index in range(len(targets)) if index not in confirmed]
+        for index, vulnerability in scheduler.run(test_inference, remaining):
+            if vulnerability:
+                findings.append((index, vulnerability))
+        
+        # Completion order varies between runs; report in discovery order
+        findings.sort(key=lambda finding: finding[0])
+        vulnerabilities = [vulnerability for _, vulnerability in findings]
+        
+        if scheduler.skipped:
             vulnerabilities.append({
                 'type': 'SQL Injection',
-                'title': f'Parameter Test Failed: {param_name}',
-                'description': f'Error testing parameter {param_name}: {str(e)}',
+                'title': 'SQL Injection Budget Exhausted',
+                'description': f'{scheduler.skipped} of {scheduler.completed + scheduler.skipped} tests across {len(targets)} parameters were skipped after {budget.spent} requests',
                 'severity': 'info',
-                'impact': 'Unable to test parameter for SQL injection',
-                'recommendation': 'Manually test this parameter for SQL injection'
+                'impact': 'Some parameters were tested with fewer payloads than others',
+                'recommendation': 'Rescan with a larger request or time budget, or test the remaining parameters manually'
             })
         
         return vulnerabilities
     
-    def _check_sql_errors(self, content):
-        """Check if response contains SQL error patterns"""
-        content_lower = content.lower()
-        for pattern in self.error_patterns:
-            if re.search(pattern, content_lower, re.IGNORECASE):
-                return True
-        return False
+    def _sender(self, session, endpoint, field, expect_slow=False):
+        """Function sending the endpoint with its default values and field set to a value
+        
+        expect_slow marks the requests as slow on purpose, so the transport's
+        rate limiter does not read their latency as an overloaded host.
+        """
+        defaults = {endpoint_field['name']: endpoint_field['value'] for endpoint_field in endpoint['inputs']}
+        
+        def send(value):
+            # Submit the whole form (or query) as a browser would, with one field injected
+            data = dict(defaults, **{field['name']: value})
+            if endpoint['method'] == 'POST':
+                return session.post(endpoint['action'], data=data, timeout=self.timeout, expect_slow=expect_slow)
+            return session.get(endpoint['action'], params=data, timeout=self.timeout, expect_slow=expect_slow)
+        return send
     
-    def _extract_forms(self, html_content):
-        """Extract forms from HTML content"""
-        forms = []
+    def _describe_target(self, endpoint, field):
+        """(title noun, description phrase) naming a parameter or form field"""
+        if endpoint['source'] == 'form':
+            return 'Form Field', f'form field "{field["name"]}" of form at {endpoint["action"]}'
+        return 'Parameter', f'parameter "{field["name"]}" of {urlparse(endpoint["action"]).path or "/"}'
+    
+    def _test_error(self, session, endpoint, field, payload):
+        """Send one payload and report a SQL error in the response"""
         try:
-            # Simple form extraction - in production, use BeautifulSoup
-            form_pattern = r'<form[^>]*action=["\']([^"\']*)["\'][^>]*>(.*?)</form>'
-            input_pattern = r'<input[^>]*name=["\']([^"\']*)["\'][^>]*>'
+            response = self._sender(session, endpoint, field)(payload)
+        except BudgetExhausted:
+            raise
+        except Exception:
+            return None
+        
+        # Check for SQL errors in response
+        sql_error = self._check_sql_errors(response.text)
+        if not sql_error:
+            return None
+        noun, target = self._describe_target(endpoint, field)
+        return {
+            'type': 'SQL Injection',
+            'title': f'SQL Injection in {noun}: {field["name"]}',
+            'description': f'SQL error detected when testing {target} with payload: {payload}',
+            'details': self._describe_sql_error(sql_error),
+            'severity': 'critical',
+            'impact': 'Database information could be extracted or modified',
+            'recommendation': 'Use parameterized queries and input validation'
+        }
+    
+    def _test_boolean_based(self, session, endpoint, field):
+        """Test a parameter with paired true/false conditions
+        
+        The parameter is vulnerable when the true condition returns the
+        original page and the false condition reproducibly returns a
+        different one. Responses are compared by fingerprint, with dynamic
+        tokens and the reflected value stripped.
+        """
+        send = self._sender(session, endpoint, field)
+        original_value = field['value']
+        
+        def fingerprint(value):
+            return ResponseFingerprint.of(send(value), removed=(value, original_value))
+        
+        try:
+            baseline = fingerprint(original_value)
+            model = SimilarityModel(baseline, fingerprint(original_value))
             
-            for form_match in re.finditer(form_pattern, html_content, re.IGNORECASE | re.DOTALL):
-                action = form_match.group(1)
-                form_content = form_match.group(2)
-                
-                inputs = []
-                for input_match in re.finditer(input_pattern, form_content, re.IGNORECASE):
-                    inputs.append(input_match.group(1))
+            for true_suffix, false_suffix in self.boolean_payloads:
+                true_value = original_value + true_suffix
+                false_value = original_value + false_suffix
+                if not model.matches(fingerprint(true_value)):
+                    continue
+                false_response = fingerprint(false_value)
+                if not model.differs(false_response):
+                    continue
+                # The false page must itself be reproducible, not noise
+                if fingerprint(false_value).distance(false_response) > model.tolerance:
+                    continue
                 
-                if inputs:
-                    forms.append({'action': action, 'inputs': inputs})
-        except:
+                noun, target = self._describe_target(endpoint, field)
+                return {
+                    'type': 'SQL Injection',
+                    'title': f'Boolean-based SQL Injection in {noun}: {field["name"]}',
+                    'description': f'Response depends on an injected condition in {target}',
+                    'details': f'"{true_value}" returned the original page; "{false_value}" consistently returned a different one '
+                               f'({baseline.distance(false_response)} of 64 fingerprint bits differ)',
+                    'severity': 'high',
+                    'impact': 'Database contents could be inferred one condition at a time',
+                    'recommendation': 'Use parameterized queries and input validation'
+                }
+        except BudgetExhausted:
+            raise
+        except Exception:
             pass
         
-        return forms
+        return None
     
-    def _test_forms(self, base_url, forms):
-        """Test forms for SQL injection"""
-        vulnerabilities = []
+    def _test_time_based(self, session, endpoint, field):
+        """Test a parameter with delay payloads through the timing engine"""
+        send = self._sender(session, endpoint, field, expect_slow=True)
         
-        for form in forms[:2]:  # Limit to first 2 forms
-            try:
-                form_url = form['action']
-                if not form_url.startswith('http'):
-                    parsed_base = urlparse(base_url)
-                    if form_url.startswith('/'):
-                        form_url = f"{parsed_base.scheme}://{parsed_base.netloc}{form_url}"
-                    else:
-                        form_url = f"{base_url.rstrip('/')}/{form_url}"
-                
-                # Test first few form inputs
-                for input_name in form['inputs'][:3]:
-                    for payload in self.payloads[:5]:  # Limit payloads for forms
-                        try:
-                            data = {input_name: payload}
-                            response = requests.post(form_url, data=data, timeout=self.timeout)
-                            
-                            if self._check_sql_errors(response.text):
-                                vulnerabilities.append({
-                                    'type': 'SQL Injection',
-                                    'title': f'SQL Injection in Form Field: {input_name}',
-                                    'description': f'SQL error detected in form field "{input_name}"',
-                                    'severity': 'critical',
-                                    'impact': 'Form submission vulnerable to SQL injection',
-                                    'recommendation': 'Use parameterized queries for form processing'
-                                })
-                                break
-                        except:
-                            continue
-            except:
-                continue
-        
-        return vulnerabilities
\ No newline at end of file
+        def send_closed(value):
+            response = send(value)
+            response.close()
+            return response
+        
+        result = self.timing.test(send_closed, field['value'], self.time_payloads)
+        if not result:
+            return None
+        noun, target = self._describe_target(endpoint, field)
+        observed = ', '.join(f'{elapsed:.2f}s' for elapsed in result['observed'])
+        return {
+            'type': 'SQL Injection',
+            'title': f'Time-based SQL Injection in {noun}: {field["name"]}',
+            'description': f'Time delay detected when testing {target} with payload: {result["payload"]}',
+            'details': f'Baseline {result["baseline"].describe()}; {result["delay"]}s delay payload took {observed}, zero-delay controls did not',
+            'severity': 'critical',
+            'impact': 'Database information could be extracted through time-based attacks',
+            'recommendation': 'Use parameterized queries and input validation'
+        }
+    
+    def _check_sql_errors(self, content):
+        """Return (database, matched text) if the response contains a SQL error, else None"""
+        return self.error_matcher.search(content)
+    
+    def _describe_sql_error(self, sql_error):
+        """Summarise a matched SQL error signature for a finding"""
+        database, matched = sql_error
+        if len(matched) > 80:
+            matched = matched[:80] + '...'
+        return f'{database} error: {matched}'
@@ -1,16 +1,189 @@
-import requests
 import ssl
 import socket
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from urllib.parse import urlparse
 import datetime
+from scanner.response_cache import ResponseCache
+from scanner.transport import get_transport
+from scanner.resolver import get_resolver
+from scanner.tls_cache import get_tls_cache
+
+# Protocol versions (as reported by SSLSocket.version()) considered weak
+WEAK_TLS_VERSIONS = ('SSLv2', 'SSLv3', 'TLSv1', 'TLSv1.1')
+
+# Versions the enumeration stage probes, weakest first
+TLS_VERSIONS = [
+    ('TLSv1', ssl.TLSVersion.TLSv1),
+    ('TLSv1.1', ssl.TLSVersion.TLSv1_1),
+    ('TLSv1.2', ssl.TLSVersion.TLSv1_2),
+    ('TLSv1.3', ssl.TLSVersion.TLSv1_3)
+]
+
+# Weak cipher groups (OpenSSL cipher strings) probed over TLS 1.2 and below
+WEAK_CIPHER_GROUPS = [
+    ('NULL encryption', 'eNULL'),
+    ('anonymous key exchange', 'aNULL'),
+    ('EXPORT', 'EXP'),
+    ('RC4', 'RC4'),
+    ('DES', 'DES'),
+    ('3DES', '3DES')
+]
+
+# Shared by every enumeration, so scanning many hosts at once never runs
+# more than this many handshakes in parallel
+_enumeration_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix='tls-enum')
+
+class TLSEnumerator:
+    """Finds which TLS versions and weak cipher groups a server accepts
+
+    Each version and cipher group is one handshake restricted to it. Up to
+    `per_host` of a host's handshakes run at once on a pool shared by all
+    hosts; versions go first, weakest first, and the stronger versions
+    are skipped as soon as the weakest accepted one is known. Probe sets
+    the local OpenSSL cannot offer are reported as untested. Results are
+    cached per host and port for `ttl` seconds, for at most max_entries
+    servers (least recently used first out).
+    """
+
+    def __init__(self, executor=None, per_host=3, timeout=5, ttl=3600, max_entries=1024):
+        self.executor = executor or _enumeration_pool
+        self.per_host = per_host
+        self.timeout = timeout
+        self.ttl = ttl
+        self.versions = [(name, self._context(version, version)) for name, version in TLS_VERSIONS]
+        self.cipher_groups = [(name, self._context(ssl.TLSVersion.MINIMUM_SUPPORTED, ssl.TLSVersion.TLSv1_2,
+                                                   f'{ciphers}:@SECLEVEL=0'))
+                              for name, ciphers in WEAK_CIPHER_GROUPS]
+        self.max_entries = max_entries
+        self._results = OrderedDict()  # (hostname, port) -> (expires, result)
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def enumerate(self, hostname, port, connect):
+        """Return {'accepted', 'rejected', 'untested', 'weakest', 'weak_ciphers'} for hostname:port
+
+        connect() must return a connected TCP socket to the server.
+        """
+        key = (hostname.lower(), port)
+        with self._lock:
+            key_lock = self._locks.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                entry = self._results.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                entry = (time.monotonic() + self.ttl, self._enumerate(hostname, connect))
+            with self._lock:
+                self._store(key, entry)
+        return entry[1]
+
+    def _store(self, key, entry):
+        self._results[key] = entry
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_entries:
+            evicted, _ = self._results.popitem(last=False)
+            self._locks.pop(evicted, None)
+
+    def _enumerate(self, hostname, connect):
+        result = {'accepted': [], 'rejected': [], 'untested': [], 'weakest': None, 'weak_ciphers': []}
+        statuses = {}
+        queue = deque()
+        for kind, probes in (('version', self.versions), ('cipher', self.cipher_groups)):
+            for name, context in probes:
+                if context is None:
+                    result['untested'].append(name)
+                    statuses[name] = 'untested'
+                else:
+                    queue.append((kind, name, context))
+
+        pending = {}
+        while queue or pending:
+            while queue and len(pending) < self.per_host:
+                kind, name, context = queue.popleft()
+                future = self.executor.submit(self._probe, hostname, connect, context)
+                pending[future] = (kind, name)
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                kind, name = pending.pop(future)
+                try:
+                    status = 'accepted' if future.result() else 'rejected'
+                except Exception:
+                    status = 'untested'  # Unreachable or timed out; says nothing about the server
+                statuses[name] = status
+                if kind == 'cipher':
+                    if status == 'accepted':
+                        result['weak_ciphers'].append(name)
+                    elif status == 'untested':
+                        result['untested'].append(name)
+                    continue
+                result[status].append(name)
+
+            if result['weakest'] is None:
+                result['weakest'] = self._weakest(statuses)
+                if result['weakest'] is not None:
+                    # Stronger versions cannot change the verdict
+                    queue = deque(probe for probe in queue if probe[0] != 'version')
+                    for future, (kind, _) in list(pending.items()):
+                        if kind == 'version' and future.cancel():
+                            del pending[future]
+
+        order = {name: index for index, (name, _) in enumerate(TLS_VERSIONS + WEAK_CIPHER_GROUPS)}
+        for values in result.values():
+            if isinstance(values, list):
+                values.sort(key=order.get)
+        return result
+
+    def _weakest(self, statuses):
+        """The weakest accepted version, once every weaker one is known to be refused"""
+        for name, _ in TLS_VERSIONS:
+            status = statuses.get(name)
+            if status == 'accepted':
+                return name
+            if status is None:
+                return None
+        return None
+
+    def _probe(self, hostname, connect, context):
+        """True if the server completes a handshake restricted by context, False if it refuses"""
+        try:
+            with connect() as sock:
+                sock.settimeout(self.timeout)
+                with context.wrap_socket(sock, server_hostname=hostname):
+                    return True
+        except (ssl.SSLError, ConnectionResetError):
+            return False
+
+    def _context(self, minimum, maximum, ciphers='ALL:@SECLEVEL=0'):
+        """Unverified client context limited to the given versions and ciphers, or None if unsupported locally"""
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        try:
+            context.minimum_version = minimum
+            context.maximum_version = maximum
+            context.set_ciphers(ciphers)
+        except (ssl.SSLError, ValueError):
+            return None
+        return context
+
+_enumerator = TLSEnumerator()
 
 class SSLChecker:
-    def __init__(self):
+    def __init__(self, resolver=None, tls_cache=None, enumerator=None, enumerate_tls=True):
         self.timeout = 10
+        self.session = get_transport()
+        self.resolver = resolver  # Defaults to the process-wide DNS cache
+        self.tls_cache = tls_cache  # Defaults to the process-wide TLS handshake cache
+        # Optional stage probing every TLS version and weak cipher group
+        self.enumerator = enumerator
+        self.enumerate_tls = enumerate_tls
 
-    def check(self, url):
+    def check(self, url, cache=None):
         """Check SSL/HTTPS configuration"""
         vulnerabilities = []
+        cache = cache or ResponseCache()
         parsed_url = urlparse(url)
         hostname = parsed_url.hostname
 
@@ -29,7 +202,7 @@ class SSLChecker:
                 # Try to access HTTPS version
                 try:
                     https_url = url.replace('http://', 'https://')
-                    response = requests.get(https_url, timeout=self.timeout, verify=False)
+                    response = cache.get(self.session, https_url, timeout=self.timeout, verify=False)
                     if response.status_code == 200:
                         vulnerabilities.append({
                             'type': 'SSL/TLS',
@@ -42,49 +215,62 @@ class SSLChecker:
                 except:
                     pass
             else:
-                # Check SSL certificate details
+                # Check SSL certificate details; the handshake result is
+                # shared by every scan of this host while it is fresh
                 try:
-                    context = ssl.create_default_context()
-                    with socket.create_connection((hostname, 443), timeout=self.timeout) as sock:
-                        with context.wrap_socket(sock, server_hostname=hostname) as ssock:
-                            cert = ssock.getpeercert()
-
-                            # Check certificate expiration
-                            not_after = cert.get('notAfter') if cert else None
-                            if isinstance(not_after, str):
-                                expiry_date = datetime.datetime.strptime(not_after, '%b %d %H:%M:%S %Y %Z')
-                                days_until_expiry = (expiry_date - datetime.datetime.utcnow()).days
-
-                                if days_until_expiry < 30:
-                                    severity = 'critical' if days_until_expiry < 7 else 'high'
-                                    vulnerabilities.append({
-                                        'type': 'SSL/TLS',
-                                        'title': 'SSL Certificate Expiring Soon',
-                                        'description': f'SSL certificate expires in {days_until_expiry} days',
-                                        'severity': severity,
-                                        'impact': 'Website will become inaccessible when certificate expires',
-                                        'recommendation': 'Renew SSL certificate immediately'
-                                    })
-                            else:
-                                vulnerabilities.append({
-                                    'type': 'SSL/TLS',
-                                    'title': 'Unexpected Certificate Format',
-                                    'description': 'Could not parse "notAfter" field in certificate',
-                                    'severity': 'medium',
-                                    'impact': 'May not detect certificate expiration accurately',
-                                    'recommendation': 'Check certificate format or manually validate'
-                                })
-
-                            # Check if certificate is self-signed
-                            if cert and cert.get('issuer') == cert.get('subject'):
-                                vulnerabilities.append({
-                                    'type': 'SSL/TLS',
-                                    'title': 'Self-Signed Certificate',
-                                    'description': 'Website uses a self-signed SSL certificate',
-                                    'severity': 'high',
-                                    'impact': 'Browsers will show security warnings to users',
-                                    'recommendation': 'Use a certificate from a trusted Certificate Authority'
-                                })
+                    port = parsed_url.port or 443
+                    handshake = (self.tls_cache or get_tls_cache()).handshake(
+                        hostname, port, lambda: self._connect(hostname, port))
+                    cert = handshake.cert
+
+                    # Check certificate expiration
+                    not_after = cert.get('notAfter') if cert else None
+                    if isinstance(not_after, str):
+                        expiry_date = datetime.datetime.strptime(not_after, '%b %d %H:%M:%S %Y %Z')
+                        days_until_expiry = (expiry_date - datetime.datetime.utcnow()).days
+
+                        if days_until_expiry < 30:
+                            severity = 'critical' if days_until_expiry < 7 else 'high'
+                            vulnerabilities.append({
+                                'type': 'SSL/TLS',
+                                'title': 'SSL Certificate Expiring Soon',
+                                'description': f'SSL certificate expires in {days_until_expiry} days',
+                                'severity': severity,
+                                'impact': 'Website will become inaccessible when certificate expires',
+                                'recommendation': 'Renew SSL certificate immediately'
+                            })
+                    else:
+                        vulnerabilities.append({
+                            'type': 'SSL/TLS',
+                            'title': 'Unexpected Certificate Format',
+                            'description': 'Could not parse "notAfter" field in certificate',
+                            'severity': 'medium',
+                            'impact': 'May not detect certificate expiration accurately',
+                            'recommendation': 'Check certificate format or manually validate'
+                        })
+
+                    # Check if certificate is self-signed
+                    if cert and cert.get('issuer') == cert.get('subject'):
+                        vulnerabilities.append({
+                            'type': 'SSL/TLS',
+                            'title': 'Self-Signed Certificate',
+                            'description': 'Website uses a self-signed SSL certificate',
+                            'severity': 'high',
+                            'impact': 'Browsers will show security warnings to users',
+                            'recommendation': 'Use a certificate from a trusted Certificate Authority'
+                        })
+
+                    # Check the negotiated protocol version, unless every
+                    # accepted one is enumerated below
+                    if not self.enumerate_tls and handshake.version in WEAK_TLS_VERSIONS:
+                        vulnerabilities.append({
+                            'type': 'SSL/TLS',
+                            'title': 'Weak TLS Version',
+                            'description': f'Server negotiated {handshake.version}',
+                            'severity': 'medium',
+                            'impact': 'Connection may be vulnerable to downgrade attacks',
+                            'recommendation': 'Disable TLS 1.0 and 1.1, use TLS 1.2 or higher'
+                        })
 
                 except ssl.SSLError as e:
                     vulnerabilities.append({
@@ -105,20 +291,9 @@ class SSLChecker:
                         'recommendation': 'Manually verify SSL configuration'
                     })
 
-                # Test SSL/TLS protocols
-                try:
-                    response = requests.get(url, timeout=self.timeout)
-                    if hasattr(response.raw, 'version') and response.raw.version < 11:
-                        vulnerabilities.append({
-                            'type': 'SSL/TLS',
-                            'title': 'Weak TLS Version',
-                            'description': 'Server supports weak TLS versions',
-                            'severity': 'medium',
-                            'impact': 'Connection may be vulnerable to downgrade attacks',
-                            'recommendation': 'Disable TLS 1.0 and 1.1, use TLS 1.2 or higher'
-                        })
-                except:
-                    pass
+                # Enumerate accepted protocol versions and weak ciphers
+                if self.enumerate_tls:
+                    vulnerabilities.extend(self._check_protocols(hostname, parsed_url.port or 443))
 
         except Exception as e:
             vulnerabilities.append({
@@ -131,3 +306,48 @@ class SSLChecker:
             })
 
         return vulnerabilities
+
+    def _check_protocols(self, hostname, port):
+        """Findings for weak TLS versions and cipher groups the server accepts"""
+        vulnerabilities = []
+        try:
+            result = (self.enumerator or _enumerator).enumerate(hostname, port, lambda: self._connect(hostname, port))
+        except Exception:
+            return vulnerabilities
+
+        weak_versions = [version for version in result['accepted'] if version in WEAK_TLS_VERSIONS]
+        if weak_versions:
+            vulnerabilities.append({
+                'type': 'SSL/TLS',
+                'title': 'Weak TLS Version',
+                'description': f'Server accepts {", ".join(weak_versions)}',
+                'severity': 'medium',
+                'impact': 'Connection may be vulnerable to downgrade attacks',
+                'recommendation': 'Disable TLS 1.0 and 1.1, use TLS 1.2 or higher'
+            })
+
+        if result['weak_ciphers']:
+            vulnerabilities.append({
+                'type': 'SSL/TLS',
+                'title': 'Weak Cipher Suites',
+                'description': f'Server accepts {", ".join(result["weak_ciphers"])} cipher suites',
+                'severity': 'high',
+                'impact': 'Traffic could be decrypted or tampered with by a network attacker',
+                'recommendation': 'Allow only AEAD cipher suites with forward secrecy (ECDHE with AES-GCM or ChaCha20)'
+            })
+
+        if result['untested']:
+            for vulnerability in vulnerabilities:
+                vulnerability['details'] = f'Not tested (unsupported locally or unreachable): {", ".join(result["untested"])}'
+
+        return vulnerabilities
+
+    def _connect(self, hostname, port):
+        """Open a TCP connection to the first reachable address of hostname"""
+        last_error = None
+        for address in (self.resolver or get_resolver()).resolve(hostname):
+            try:
+                return socket.create_connection((address, port), timeout=self.timeout)
+            except OSError as e:
+                last_error = e
+        raise last_error
@@ -0,0 +1,83 @@
+import codecs
+
+class BodyReader:
+    """Reads a streamed (stream=True) response body as overlapping text windows
+
+    At most max_bytes of the body are read, chunk_size at a time, so a
+    multi-GB download never has to fit in memory. Consecutive windows
+    overlap by `overlap` characters. Each window comes with a (fresh, limit)
+    range: a match is counted in the window where its end falls inside the
+    range, so every match up to overlap / 2 characters long is seen whole
+    and counted exactly once.
+    """
+
+    def __init__(self, response, max_bytes=1024 * 1024, chunk_size=64 * 1024, overlap=1024):
+        self.response = response
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.bytes_read = 0
+        self.truncated = False  # True if the body went on past max_bytes
+
+    def windows(self):
+        """Yield (window, fresh, limit) until the body ends or the byte cap is hit"""
+        tail = ''
+        fresh = 0
+        pending = None
+        for text in self.texts():
+            if pending is not None:
+                window = tail + pending
+                tail = window[-self.overlap:]
+                # Matches ending in the last half of the overlap may be cut
+                # short here; the next window sees them whole
+                keep = len(tail) // 2
+                yield window, fresh, len(window) - keep
+                fresh = len(tail) - keep
+            pending = text
+        if pending is not None:
+            window = tail + pending
+            yield window, fresh, len(window)
+
+    def texts(self):
+        """Decoded, non-overlapping pieces of the body, up to max_bytes"""
+        try:
+            decoder = codecs.getincrementaldecoder(self.response.encoding or 'utf-8')(errors='replace')
+        except LookupError:
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+        for chunk in self.response.iter_content(self.chunk_size):
+            if not chunk:
+                continue
+            remaining = self.max_bytes - self.bytes_read
+            if len(chunk) > remaining:
+                chunk = chunk[:remaining]
+                self.truncated = True
+            self.bytes_read += len(chunk)
+            text = decoder.decode(chunk)
+            if text:
+                yield text
+            if self.truncated:
+                break
+
+        text = decoder.decode(b'', final=True)
+        if text:
+            yield text
+
+def release(response, drain_limit=64 * 1024):
+    """Finish with a streamed response, keeping its connection when that is cheap
+
+    A small unread body is drained so the keep-alive connection goes back
+    to the pool; anything larger is dropped by closing the connection.
+    """
+    try:
+        length = int(response.headers.get('Content-Length', ''))
+    except ValueError:
+        length = None
+    try:
+        if length is not None and length <= drain_limit:
+            for _ in response.iter_content(drain_limit):
+                pass
+    except Exception:
+        pass
+    finally:
+        response.close()
@@ -0,0 +1,120 @@
+import math
+import statistics
+import time
+from scanner.bounded import bounded_map
+from scanner.budget import BudgetExhausted
+
+class TimingBaseline:
+    """Latency samples of a request with a harmless value"""
+
+    def __init__(self, samples):
+        self.samples = sorted(samples)
+        self.mean = statistics.fmean(self.samples)
+        self.stdev = statistics.stdev(self.samples) if len(self.samples) > 1 else 0.0
+
+    @property
+    def median(self):
+        return statistics.median(self.samples)
+
+    def describe(self):
+        return f'{self.mean:.2f}s mean, {self.stdev:.2f}s std dev over {len(self.samples)} samples'
+
+class TimingEngine:
+    """Adaptive detector for payloads that delay the response on purpose
+
+    The harmless value is sent `samples` times concurrently to learn the
+    target's latency and jitter. A payload asking for a delay of d seconds
+    counts as delayed when the response is at least d / 2 slower than the
+    baseline mean; d starts at `delay` and is raised (up to max_delay) on
+    jittery targets until d / 2 clears `deviations` standard deviations.
+    Initial probes run concurrently. A delayed one is then confirmed by
+    `confirmations` rounds of a zero-delay control (must be fast) and the
+    delayed payload again (must be slow); the first failure clears it, the
+    first confirmed payload ends the test.
+    """
+
+    def __init__(self, samples=5, delay=2, max_delay=6, deviations=4, confirmations=2, concurrency=5):
+        self.samples = samples
+        self.delay = delay
+        self.max_delay = max_delay
+        self.deviations = deviations
+        self.confirmations = confirmations
+        self.concurrency = concurrency
+
+    def measure(self, send, value):
+        """Seconds taken by send(value), or None if it failed
+
+        When send returns a response, its own elapsed time is used, so
+        time spent waiting for a budget or host slot is not counted.
+        """
+        start = time.perf_counter()
+        try:
+            response = send(value)
+        except BudgetExhausted:
+            raise
+        except Exception:
+            return None
+        elapsed = getattr(response, 'elapsed', None)
+        if elapsed is not None:
+            return elapsed.total_seconds()
+        return time.perf_counter() - start
+
+    def baseline(self, send, value):
+        """Sample the latency of value concurrently; None if too few requests succeeded"""
+        samples = [elapsed for _, elapsed in bounded_map(lambda _: self.measure(send, value),
+                                                         range(self.samples), self.concurrency)
+                   if elapsed is not None]
+        if len(samples) < max(2, self.samples // 2 + 1):
+            return None
+        return TimingBaseline(samples)
+
+    def choose_delay(self, baseline):
+        """Smallest delay whose half clears the baseline jitter, or None if max_delay is not enough"""
+        needed = math.ceil(2 * self.deviations * baseline.stdev)
+        delay = max(self.delay, needed)
+        return delay if delay <= self.max_delay else None
+
+    def test(self, send, value, payloads):
+        """Test payload templates ({delay} placeholder) against the harmless value
+
+        send(value) must issue one request (returning the response, if any)
+        and raise on failure; it should time out after more than baseline +
+        max_delay seconds. Returns
+        {'payload', 'delay', 'baseline', 'observed'} for the first confirmed
+        payload, or None.
+        """
+        baseline = self.baseline(send, value)
+        if baseline is None:
+            return None
+        delay = self.choose_delay(baseline)
+        if delay is None:
+            return None
+        threshold = baseline.mean + delay / 2
+
+        def probe(template):
+            return self.measure(send, template.format(delay=delay))
+
+        for template, elapsed in bounded_map(probe, payloads, self.concurrency):
+            if elapsed is None or elapsed < threshold:
+                continue  # Cleared
+            observed = [elapsed]
+            if self._confirm(send, template, delay, threshold, observed):
+                return {
+                    'payload': template.format(delay=delay),
+                    'delay': delay,
+                    'baseline': baseline,
+                    'observed': observed
+                }
+        return None
+
+    def _confirm(self, send, template, delay, threshold, observed):
+        """Alternate zero-delay controls and delayed repeats; False at the first inconsistency"""
+        for _ in range(self.confirmations):
+            control = self.measure(send, template.format(delay=0))
+            if control is None or control >= threshold:
+                return False
+            elapsed = self.measure(send, template.format(delay=delay))
+            if elapsed is None or elapsed < threshold:
+                return False
+            observed.append(elapsed)
+        return True
@@ -0,0 +1,123 @@
+import ssl
+import threading
+import time
+from collections import OrderedDict
+
+class TLSHandshake:
+    """What one TLS handshake with a server revealed"""
+
+    __slots__ = ('cert', 'version', 'cipher', 'resumed', 'performed_at')
+
+    def __init__(self, cert, version, cipher, resumed):
+        self.cert = cert or {}
+        self.version = version  # e.g. 'TLSv1.3'
+        self.cipher = cipher  # (name, protocol, secret bits)
+        self.resumed = resumed  # True if an earlier session was resumed
+        self.performed_at = time.time()
+
+    @property
+    def not_after(self):
+        """Certificate expiry as a Unix timestamp, or None if it cannot be parsed"""
+        value = self.cert.get('notAfter')
+        if not isinstance(value, str):
+            return None
+        try:
+            return ssl.cert_time_to_seconds(value)
+        except ValueError:
+            return None
+
+class TLSCache:
+    """Process-wide cache of TLS handshake results per host, port and SNI name
+
+    A result is reused for default_ttl seconds, but never past the
+    certificate's notAfter, so repeated scans of one host (or a batch of
+    its URLs) do a single handshake. Failed handshakes are remembered for
+    negative_ttl. When an entry expires, the next handshake offers the
+    previous TLS session, so servers that support resumption skip the full
+    key exchange and certificate transfer. (TLS 1.3 tickets arrive after
+    the handshake and are not waited for, so only TLS 1.2 sessions are
+    resumed.)
+    """
+
+    def __init__(self, context=None, default_ttl=3600, negative_ttl=60, max_entries=1024):
+        # Sessions can only be resumed through the context that created them
+        self.context = context or ssl.create_default_context()
+        self.default_ttl = default_ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.handshakes = 0
+        self.resumptions = 0
+        self._entries = OrderedDict()  # key -> (expires, TLSHandshake or exception)
+        self._sessions = OrderedDict()  # key -> ssl.SSLSession
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def handshake(self, hostname, port, connect, server_name=None):
+        """Return the TLSHandshake for hostname:port, raising the cached error if it failed
+
+        connect() must return a connected TCP socket; it is only called
+        when no fresh result is cached.
+        """
+        server_name = server_name or hostname
+        key = (hostname.lower(), port, server_name.lower())
+        with self._lock:
+            key_lock = self._locks.setdefault(key, threading.Lock())
+
+        # Only one thread handshakes with a given server; the rest wait for its result
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                entry = self._perform(key, connect, server_name)
+                with self._lock:
+                    self._store(self._entries, key, entry)
+
+        if isinstance(entry[1], Exception):
+            raise entry[1]
+        return entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sessions.clear()
+
+    def _perform(self, key, connect, server_name):
+        with self._lock:
+            session = self._sessions.get(key)
+        try:
+            with connect() as sock:
+                with self.context.wrap_socket(sock, server_hostname=server_name, session=session) as ssock:
+                    result = TLSHandshake(ssock.getpeercert(), ssock.version(), ssock.cipher(), ssock.session_reused)
+                    new_session = ssock.session
+        except ssl.SSLError as e:
+            return (time.monotonic() + self.negative_ttl, e)
+
+        with self._lock:
+            self.handshakes += 1
+            self.resumptions += result.resumed
+            if new_session is not None:
+                self._store(self._sessions, key, new_session)
+
+        ttl = self.default_ttl
+        if result.not_after is not None:
+            ttl = max(0, min(ttl, result.not_after - time.time()))
+        return (time.monotonic() + ttl, result)
+
+    def _store(self, entries, key, value):
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            evicted, _ = entries.popitem(last=False)
+            if entries is self._entries:
+                self._locks.pop(evicted, None)
+
+_tls_cache = TLSCache()
+
+def get_tls_cache():
+    """Return the process-wide TLS handshake cache"""
+    return _tls_cache
+
+def set_tls_cache(cache):
+    """Replace the process-wide TLS cache, e.g. with one using a test context"""
+    global _tls_cache
+    _tls_cache = cache
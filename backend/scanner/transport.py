@@ -0,0 +1,137 @@
+import threading
+from http.cookiejar import DefaultCookiePolicy
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import EmptyPoolError
+from scanner.rate_limit import RateLimiter, THROTTLE_STATUSES
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+class PoolTimeout(requests.exceptions.ConnectionError):
+    """No pooled connection to the host became free within the pool timeout"""
+
+class BoundedPoolAdapter(HTTPAdapter):
+    """HTTPAdapter whose blocking pools give up after pool_timeout seconds
+
+    requests never passes a pool timeout to urllib3, so with pool_block a
+    leaked or nested connection would otherwise stall every later request
+    to the host forever.
+    """
+
+    def __init__(self, pool_timeout=30, **kwargs):
+        self.pool_timeout = pool_timeout
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _bounded_pool(HTTPConnectionPool, self.pool_timeout),
+            'https': _bounded_pool(HTTPSConnectionPool, self.pool_timeout)
+        }
+
+    def send(self, request, *args, **kwargs):
+        try:
+            return super().send(request, *args, **kwargs)
+        except EmptyPoolError as e:
+            raise PoolTimeout(e, request=request)
+
+def _bounded_pool(pool_class, pool_timeout):
+    """Subclass of a urllib3 pool class that waits at most pool_timeout for a connection"""
+    class BoundedPool(pool_class):
+        def _get_conn(self, timeout=None):
+            return super()._get_conn(timeout=pool_timeout if timeout is None else timeout)
+    return BoundedPool
+
+class HTTPTransport:
+    """Pooled keep-alive HTTP transport shared by every scanner module"""
+
+    def __init__(self, max_hosts=64, max_per_host=10, connect_timeout=5, read_timeout=10,
+                 pool_timeout=30, user_agent=DEFAULT_USER_AGENT, rate_limiter=None):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        # Every request from every scan waits for its host's (adaptive) rate
+        self.rate_limiter = rate_limiter or RateLimiter()
+
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': user_agent})
+        # Scans of unrelated targets share this session, so never carry
+        # cookies from one request (or scan) into the next
+        self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+
+        # One pool per host, each capped at max_per_host connections;
+        # pool_block makes extra requests wait for a free connection
+        # instead of opening throwaway ones, for up to pool_timeout seconds
+        adapter = BoundedPoolAdapter(pool_timeout=pool_timeout, pool_connections=max_hosts,
+                                     pool_maxsize=max_per_host, pool_block=True, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    @property
+    def headers(self):
+        return self.session.headers
+
+    def request(self, method, url, **kwargs):
+        """Send a request over the shared connection pools, at the rate the host allows
+
+        A GET or HEAD answered with 429/503 and a Retry-After the limiter
+        honours is sent once more after the wait. Pass expect_slow=True for
+        requests meant to be slow (time-based probes), so their latency and
+        read timeouts do not lower the host's rate.
+        """
+        expect_slow = kwargs.pop('expect_slow', False)
+        kwargs['timeout'] = self._timeout(kwargs.get('timeout'))
+        retries = 1 if method in ('GET', 'HEAD') else 0
+        while True:
+            self.rate_limiter.acquire(url)
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.RequestException as e:
+                # Timeouts and refused or reset connections suggest an
+                # overloaded host; TLS and URL errors and our own full
+                # pool do not
+                overloaded = (isinstance(e, (requests.Timeout, requests.ConnectionError))
+                              and not isinstance(e, (requests.exceptions.SSLError, PoolTimeout))
+                              and not (expect_slow and isinstance(e, requests.ReadTimeout)))
+                self.rate_limiter.observe(url, failed=overloaded)
+                raise
+            retry_after = response.headers.get('Retry-After')
+            self.rate_limiter.observe(url, response.status_code, response.elapsed.total_seconds(), retry_after,
+                                      expect_slow=expect_slow)
+            if (retries and response.status_code in THROTTLE_STATUSES
+                    and self.rate_limiter.honours(retry_after)):
+                retries -= 1
+                response.close()
+                continue
+            return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def head(self, url, **kwargs):
+        kwargs.setdefault('allow_redirects', False)
+        return self.request('HEAD', url, **kwargs)
+
+    def post(self, url, data=None, **kwargs):
+        return self.request('POST', url, data=data, **kwargs)
+
+    def _timeout(self, timeout):
+        """Apply the connect/read timeout policy to a caller's timeout"""
+        if timeout is None:
+            return (self.connect_timeout, self.read_timeout)
+        if isinstance(timeout, tuple):
+            return timeout
+        # A single number from a checker bounds the read; connecting never
+        # waits longer than the transport-wide connect timeout
+        return (min(self.connect_timeout, timeout), timeout)
+
+_transport = None
+_transport_lock = threading.Lock()
+
+def get_transport():
+    """Return the process-wide transport, creating it on first use"""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = HTTPTransport()
+        return _transport
